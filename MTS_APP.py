@@ -1,8 +1,10 @@
 # MTS_APP.py
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import logging
 from MTS_world import get_and_convert_blocks
+from MTS_progress import ConversionProgress, format_event
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
@@ -11,7 +13,7 @@ class BlockTextureUI:
     def __init__(self):
         self.window = tk.Tk()
         self.window.title("Minecraft to Source Converter")
-        self.window.geometry("835x340")
+        self.window.geometry("835x480")
         # Default paths
         self.world_path = tk.StringVar(value=r"Localization to your Minecraft WORLD")
         self.output_path = tk.StringVar(value=r"Location to where you want to save the VMF file")
@@ -19,6 +21,7 @@ class BlockTextureUI:
         self.z1 = tk.StringVar(value="-65")
         self.x2 = tk.StringVar(value="65")
         self.z2 = tk.StringVar(value="65")
+        self.workers = tk.StringVar(value="1")
         self.setup_ui()
 
     def setup_ui(self):
@@ -48,12 +51,28 @@ class BlockTextureUI:
         mirror_frame.pack(fill="x", padx=5, pady=5)
         ttk.Label(mirror_frame, text="Mirror Axis (x/y):").grid(row=0, column=0, sticky="w")
         ttk.Combobox(mirror_frame, textvariable=self.mirror_axis, values=["x", "y"]).grid(row=0, column=1, padx=5)
+        # Parallel chunk scanning
+        ttk.Label(mirror_frame, text="Workers:").grid(row=0, column=2, sticky="w")
+        ttk.Spinbox(mirror_frame, textvariable=self.workers, from_=1, to=os.cpu_count() or 1, width=5).grid(row=0, column=3, padx=5)
         # Checkbox for optimization
-        self.optimize_var = tk.BooleanVar(value=False)
-        optimize_checkbox = ttk.Checkbutton(self.window, text="Optimize the grid (merge blocks) WIP, I do not recommend using it", variable=self.optimize_var)
+        self.optimize_var = tk.BooleanVar(value=True)
+        optimize_checkbox = ttk.Checkbutton(self.window, text="Optimize the grid (merge blocks into larger brushes)", variable=self.optimize_var)
         optimize_checkbox.pack(pady=5)
+        # Checkboxes for hidden block culling
+        self.cull_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.window, text="Remove hidden blocks (enclosed by opaque blocks)", variable=self.cull_var).pack(pady=2)
+        self.caves_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.window, text="Also remove sealed caves (not reachable from the sky or selection border)", variable=self.caves_var).pack(pady=2)
+        # Checkbox for streaming conversion
+        self.stream_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.window, text="Low memory mode (convert chunk by chunk, for very large areas)", variable=self.stream_var).pack(pady=2)
         # Convert button
         ttk.Button(self.window, text="Convert", command=self.convert).pack(pady=10)
+        # Conversion progress
+        self.progress_bar = ttk.Progressbar(self.window, length=400)
+        self.progress_bar.pack()
+        self.status = tk.StringVar(value="")
+        ttk.Label(self.window, textvariable=self.status).pack()
         # Links to authors
         credit_frame = tk.Frame(self.window)
         credit_frame.pack(side="bottom", pady=5)
@@ -91,7 +110,24 @@ class BlockTextureUI:
         if path:
             self.output_path.set(path)
 
+    def show_progress(self, event):
+        # Subscribed to the conversion progress, chunks are shown in the bar, other stages only move it
+        counters = event.counters
+        if event.finished:
+            self.progress_bar.configure(mode="determinate", maximum=1, value=1)
+        elif counters["chunks_scanned"] < counters["chunks_total"]:
+            self.progress_bar.configure(mode="determinate", maximum=counters["chunks_total"],
+                                        value=counters["chunks_scanned"])
+        else:
+            self.progress_bar.configure(mode="indeterminate", maximum=100)
+            self.progress_bar.step()
+        self.status.set(format_event(event))
+        self.window.update_idletasks()
+
     def convert(self):
+        self.progress_bar.configure(value=0)
+        progress = ConversionProgress()
+        progress.subscribe(self.show_progress)
         try:
             get_and_convert_blocks(
                 self.world_path.get(),
@@ -99,7 +135,12 @@ class BlockTextureUI:
                 int(self.x2.get()), int(self.z2.get()),
                 self.output_path.get(),
                 mirror_axis=self.mirror_axis.get(),
-                optimize=self.optimize_var.get() 
+                optimize=self.optimize_var.get(),
+                workers=int(self.workers.get()),
+                cull_hidden=self.cull_var.get(),
+                remove_caves=self.caves_var.get(),
+                stream=self.stream_var.get(),
+                progress=progress
             )
             messagebox.showinfo("Success", "Conversion completed successfully!")
         except Exception as e:
@@ -0,0 +1,65 @@
+# MTS_CLI.py
+import argparse
+import logging
+import os
+import sys
+from MTS_world import get_and_convert_blocks
+from MTS_progress import STAGES, ConversionProgress, format_event
+
+log = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Minecraft to Source Converter")
+    parser.add_argument("world", help="Minecraft world folder")
+    parser.add_argument("x1", type=int)
+    parser.add_argument("z1", type=int)
+    parser.add_argument("x2", type=int)
+    parser.add_argument("z2", type=int)
+    parser.add_argument("output", help="VMF file to write")
+    parser.add_argument("--dimension", default="minecraft:overworld")
+    parser.add_argument("--mirror", choices=("x", "y"), default=None, help="Mirror axis")
+    parser.add_argument("--no-optimize", action="store_true", help="Keep one brush per block")
+    parser.add_argument("--workers", type=int, default=1, help=f"Processes to use (this machine has {os.cpu_count()})")
+    parser.add_argument("--cull", action="store_true", help="Remove hidden blocks (enclosed by opaque blocks)")
+    parser.add_argument("--remove-caves", action="store_true", help="Also remove sealed caves")
+    parser.add_argument("--stream", action="store_true", help="Low memory mode (convert chunk by chunk)")
+    parser.add_argument("--no-report", action="store_true", help="Don't write the JSON run report next to the VMF")
+    parser.add_argument("--profile", choices=STAGES, metavar="STAGE",
+                        help=f"Profile a stage with cProfile ({', '.join(STAGES)}), saved next to the VMF")
+    parser.add_argument("--trace-memory", choices=STAGES, metavar="STAGE",
+                        help="Trace the allocations of a stage with tracemalloc, the largest go in the run report")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="Log the stages instead of the status line, -vv also logs every chunk and block")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only log warnings and errors, no status line")
+    return parser.parse_args(argv)
+
+
+def print_event(event):
+    # Rewrites a single status line, a new line is started at the end of the conversion
+    sys.stderr.write("\r" + format_event(event).ljust(100) + ("\n" if event.finished else ""))
+    sys.stderr.flush()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    level = (logging.WARNING, logging.INFO, logging.DEBUG)[min(args.verbose, 2)]
+    # amulet sets up logging when it's imported
+    logging.basicConfig(level=level, format="%(levelname)s - %(message)s", force=True)
+
+    progress = ConversionProgress(profile=args.profile, trace_memory=args.trace_memory)
+    if not args.quiet and not args.verbose:
+        progress.subscribe(print_event)
+    try:
+        get_and_convert_blocks(args.world, args.x1, args.z1, args.x2, args.z2, args.output,
+                               dimension=args.dimension, mirror_axis=args.mirror, optimize=not args.no_optimize,
+                               workers=args.workers, cull_hidden=args.cull, remove_caves=args.remove_caves,
+                               stream=args.stream, progress=progress, report=not args.no_report)
+    except Exception:
+        log.exception("Conversion failed:")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
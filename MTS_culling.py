@@ -0,0 +1,136 @@
+# MTS_culling.py
+import logging
+import numpy
+from MTS_voxels import VoxelStore
+
+log = logging.getLogger(__name__)
+
+# Blocks that do not hide their neighbours - air, see-through blocks and blocks that are not full cubes.
+# A name matches a block if it is equal to the block name or is its last "_" separated part
+# (e.g. "slab" matches "stone_slab", "glass" matches "stained_glass"). Names that are also the last part of full
+# blocks go in EXACT_TRANSPARENT_BLOCKS instead.
+TRANSPARENT_BLOCKS = frozenset({
+    "air", "light", "structure_void", "fire", "portal", "end_gateway",
+    "glass", "glass_pane", "pane", "leaves", "water", "lava", "bubble_column",
+    "slab", "stairs", "fence", "fence_gate", "wall", "door", "trapdoor", "bars", "chain", "carpet",
+    "torch", "wall_torch", "sign", "wall_sign", "hanging_sign", "banner", "button", "lever",
+    "pressure_plate", "rail", "ladder", "vine", "vines", "sapling", "flower", "plant", "grass",
+    "short_grass", "tall_grass", "fern", "dead_bush", "mushroom", "coral", "coral_fan", "kelp", "seagrass",
+    "sugar_cane", "bamboo", "cactus", "cobweb", "scaffolding", "slime_block", "honey_block", "farmland",
+    "dirt_path", "chest", "bed", "cake", "candle", "flower_pot", "head", "skull", "anvil",
+    "bell", "hopper", "cauldron", "brewing_stand", "enchanting_table", "lectern", "stonecutter",
+    "grindstone", "campfire", "composter", "daylight_detector", "repeater", "comparator", "redstone_wire",
+    "tripwire", "tripwire_hook", "end_rod", "lightning_rod", "pointed_dripstone", "amethyst_cluster",
+    "bud", "dripleaf", "dripleaf_stem", "azalea", "spawner", "beacon", "conduit",
+    "sea_pickle", "turtle_egg", "frogspawn", "end_portal_frame",
+    # Flowers
+    "dandelion", "poppy", "orchid", "allium", "bluet", "tulip", "daisy", "cornflower", "lily_of_the_valley",
+    "rose", "torchflower", "sunflower", "lilac", "peony", "bush", "petals", "blossom", "lily_pad",
+    # Crops and other plants
+    "wheat", "carrots", "potatoes", "beetroots", "crop", "melon_stem", "pumpkin_stem", "cocoa", "nether_wart",
+    "fungus", "sprouts", "crimson_roots", "warped_roots", "hanging_roots", "lichen", "vein",
+})
+# Transparent blocks only matched by their whole name: packed_ice and blue_ice, jack_o_lantern and sea_lantern,
+# powder_snow and muddy_mangrove_roots are full blocks
+EXACT_TRANSPARENT_BLOCKS = frozenset({
+    "ice", "frosted_ice", "lantern", "soul_lantern", "snow", "mangrove_roots", "grass_path",
+})
+
+def is_transparent(block_name, transparent_blocks=TRANSPARENT_BLOCKS, exact_blocks=EXACT_TRANSPARENT_BLOCKS):
+    """
+    Checks if a block lets its neighbours be seen (see TRANSPARENT_BLOCKS for the matching rules),
+    exact_blocks are only matched by their whole name.
+    """
+    short_name = block_name.split(":")[-1]
+    if short_name in transparent_blocks or short_name in exact_blocks:
+        return True
+    return any(short_name.endswith("_" + name) for name in transparent_blocks)
+
+def _neighbours_all(grid):
+    """
+    For a padded boolean grid, returns for every inner cell whether all six neighbours are set.
+    """
+    return (grid[2:, 1:-1, 1:-1] & grid[:-2, 1:-1, 1:-1] &
+            grid[1:-1, 2:, 1:-1] & grid[1:-1, :-2, 1:-1] &
+            grid[1:-1, 1:-1, 2:] & grid[1:-1, 1:-1, :-2])
+
+def _dilate(grid):
+    """
+    Grows the set cells of a boolean grid by one cell in all six directions.
+    """
+    grown = grid.copy()
+    grown[1:, :, :] |= grid[:-1, :, :]
+    grown[:-1, :, :] |= grid[1:, :, :]
+    grown[:, 1:, :] |= grid[:, :-1, :]
+    grown[:, :-1, :] |= grid[:, 1:, :]
+    grown[:, :, 1:] |= grid[:, :, :-1]
+    grown[:, :, :-1] |= grid[:, :, 1:]
+    return grown
+
+def _reachable_space(opaque):
+    """
+    Flood fills the non-opaque cells of a padded grid starting from its outer shell (sky and selection boundary).
+    Returns the grid of reachable cells - closed caves stay unreached.
+
+    The fill is a breadth first search over the flat grid, only the cells reached by the previous step are
+    expanded, so every cell is visited once whatever the length of the paths.
+    """
+    reach = numpy.zeros_like(opaque)
+    reach[[0, -1], :, :] = True
+    reach[:, [0, -1], :] = True
+    reach[:, :, [0, -1]] = True
+    passable = ~opaque.reshape(-1)
+    flat = reach.reshape(-1)
+    # Neighbour offsets in the flat grid, only shell cells (already reached) can step across a row or out of the grid
+    strides = numpy.array(reach.strides) // reach.itemsize
+    offsets = numpy.concatenate((strides, -strides))
+    frontier = numpy.flatnonzero(flat)
+    iterations = 0
+    while len(frontier):
+        cells = (frontier[:, None] + offsets).reshape(-1)
+        cells = cells[(cells >= 0) & (cells < len(flat))]
+        cells = numpy.unique(cells[passable[cells] & ~flat[cells]])
+        flat[cells] = True
+        frontier = cells
+        iterations += 1
+    log.debug(f"Flood fill finished after {iterations} iterations")
+    return reach
+
+def cull_hidden_blocks(blocks, transparent_blocks=TRANSPARENT_BLOCKS, remove_caves=False):
+    """
+    Removes blocks that can never be seen.
+
+    Parameters:
+    blocks: VoxelStore or list of tuples (x, y, z, block_type, properties)
+    transparent_blocks: names of blocks that do not hide their neighbours (see TRANSPARENT_BLOCKS)
+    remove_caves: if True, only blocks touching space reachable from the sky or the selection boundary are kept,
+    which also removes the walls of sealed caves. Otherwise a block is removed when its six neighbours are all
+    opaque full blocks.
+
+    Space outside the selection counts as empty, so blocks on the selection boundary are always kept.
+    Returns the remaining blocks in their original order, in the same container type as given.
+    """
+    if not blocks:
+        return blocks
+    store = blocks if isinstance(blocks, VoxelStore) else VoxelStore.from_records(blocks)
+
+    opaque_flags = store.state_lookup(lambda block_type, _: not is_transparent(block_type, transparent_blocks))
+    xs = store.x.astype(numpy.int64)
+    ys = store.y.astype(numpy.int64)
+    zs = store.z.astype(numpy.int64)
+    # Grid padded by one empty cell on every side, block (x, y, z) is at cell (x - min_x + 1, ...)
+    xs -= xs.min() - 1
+    ys -= ys.min() - 1
+    zs -= zs.min() - 1
+    opaque = numpy.zeros((xs.max() + 2, ys.max() + 2, zs.max() + 2), dtype=bool)
+    opaque[xs, ys, zs] = opaque_flags
+
+    if remove_caves:
+        visible = _dilate(_reachable_space(opaque))[xs, ys, zs]
+    else:
+        visible = ~_neighbours_all(opaque)[xs - 1, ys - 1, zs - 1]
+
+    log.info(f"Culled {len(store) - int(visible.sum())} hidden blocks, {int(visible.sum())} remaining")
+    if store is blocks:
+        return store.select(visible)
+    return [block for block, keep in zip(blocks, visible.tolist()) if keep]
@@ -1,4 +1,14 @@
 # MTS_optimization.py
+import logging
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from MTS_voxels import VoxelStore
+
+log = logging.getLogger(__name__)
+
+# Largest occupancy grid (in cells) built by greedy_mesh for one block state, bigger groups are split into tiles
+GREEDY_MAX_CELLS = 1 << 24
 
 def partition_layer(coords):
     """
@@ -50,39 +60,15 @@ def partition_layer(coords):
 
 def merge_layers(rect_dict, block_type, properties):
     """
-    Merges rectangles from consecutive layers (key = y).
+    Merges identical rectangles from consecutive layers (key = y).
+    Rectangles are looked up by (min_x, min_z, width, depth) in a hash map, so the time is linear in the
+    number of rectangles. A cuboid only grows through consecutive y values, never across an empty layer.
     Returns a list of cuboids as tuples:
     (min_x, min_y, min_z, size_x, size_y, size_z, block_type, properties)
     """
-    merged = []
-    ys = sorted(rect_dict.keys())
-    processed = {y: [False] * len(rect_dict[y]) for y in ys}
-    
-    for i, y in enumerate(ys):
-        for j, rect in enumerate(rect_dict[y]):
-            if processed[y][j]:
-                continue
-            current_rect = rect
-            min_y = y
-            max_y = y
-            processed[y][j] = True
-            for y_next in ys[i+1:]:
-                found = False
-                for k, rect_next in enumerate(rect_dict[y_next]):
-                    if processed[y_next][k]:
-                        continue
-                    if rect_next == current_rect:
-                        processed[y_next][k] = True
-                        max_y = y_next
-                        found = True
-                        break
-                if not found:
-                    break
-            size_x = current_rect[2]
-            size_z = current_rect[3]
-            size_y = max_y - min_y + 1
-            merged.append((current_rect[0], min_y, current_rect[1], size_x, size_y, size_z, block_type, properties))
-    return merged
+    layers = [(min_x, y, min_z, width, 1, depth)
+              for y in sorted(rect_dict) for (min_x, min_z, width, depth) in rect_dict[y]]
+    return [box + (block_type, properties) for box in _stack_boxes(layers)]
 
 def merge_layers_horizontal(layer_rects, block_type, properties):
     """Merging layers for the horizontal direction – we use the default method."""
@@ -120,67 +106,257 @@ def adjust_pivot(cuboid, direction):
     # (implementation of the pivot correction depends on further needs)
     return cuboid
 
-def simulate_optimization(blocks, direction="horizontal"):
+def simulate_optimization(blocks, direction="horizontal", method="greedy"):
     """
     Performs an optimization simulation for the given direction.
     Returns a metric - here the number of merged cuboids.
     """
-    merged = optimize_blocks(blocks, direction)
+    merged = optimize_blocks(blocks, direction, method)
     error = len(merged)
     return {"error": error, "merged": merged}
 
-def analyze_blocks(blocks):
+def analyze_blocks(blocks, method="greedy"):
     """
-    Analyzes the block layout, performing simulation for both horizontal and vertical directions,
-    and returns the direction with the least number of resulting objects.
+    Analyzes the block layout, meshing every block state once in both horizontal and vertical directions,
+    and returns the direction with the least number of resulting objects in total.
     """
-    stats_h = simulate_optimization(blocks, direction="horizontal")
-    stats_v = simulate_optimization(blocks, direction="vertical")
-    if stats_h["error"] <= stats_v["error"]:
+    counts = {"horizontal": 0, "vertical": 0}
+    for group in group_positions(blocks):
+        horizontal, vertical = _mesh_both(group, method)
+        counts["horizontal"] += len(horizontal)
+        counts["vertical"] += len(vertical)
+    if counts["horizontal"] <= counts["vertical"]:
         return "horizontal"
     else:
         return "vertical"
 
-def optimize_blocks(blocks, direction=None):
+def greedy_mesh(xs, ys, zs, direction="horizontal", layered=None):
+    """
+    3D greedy meshing of the blocks of one block state.
+    xs, ys, zs: integer arrays with the block positions
+    direction: "horizontal" grows boxes along x, then z, then y; "vertical" along z, then x, then y.
+    layered: the boxes of layered_boxes for these blocks, when they're already known (they don't depend on
+    the direction).
+
+    Three meshings are made and the one with fewer boxes is kept:
+    - boxes started at the first free block in (y, z, x) order (in the direction) and grown as far as possible
+      along each axis,
+    - the largest rectangles of each layer, in the direction, stacked through consecutive layers,
+    - the boxes of the layered optimizer (method="layers", partition_layer and merge_layers), whatever the direction.
+    The last one makes the result never worse than the layered optimizer in either direction, as long as the
+    group isn't split into tiles (more than GREEDY_MAX_CELLS cells); the first one is usually the best.
+    Returns a list of boxes (min_x, min_y, min_z, size_x, size_y, size_z).
+    """
+    xs = numpy.asarray(xs, dtype=numpy.int64)
+    ys = numpy.asarray(ys, dtype=numpy.int64)
+    zs = numpy.asarray(zs, dtype=numpy.int64)
+    if layered is None:
+        layered = layered_boxes(xs, ys, zs)
+    if direction == "vertical":
+        boxes = [(b[2], b[1], b[0], b[5], b[4], b[3]) for b in _greedy_boxes(zs, ys, xs)]
+        stacked = [(b[2], b[1], b[0], b[5], b[4], b[3])
+                   for b in _stack_boxes(_greedy_boxes(zs, ys, xs, grow_y=False))]
+    else:
+        boxes = _greedy_boxes(xs, ys, zs)
+        stacked = _stack_boxes(_greedy_boxes(xs, ys, zs, grow_y=False))
+    return min(boxes, stacked, layered, key=len)
+
+def layered_boxes(xs, ys, zs):
+    """
+    The boxes of the layered optimizer (partition_layer then merge_layers, in either direction) for the blocks
+    of one block state, see greedy_mesh.
+    """
+    xs = numpy.asarray(xs, dtype=numpy.int64)
+    ys = numpy.asarray(ys, dtype=numpy.int64)
+    zs = numpy.asarray(zs, dtype=numpy.int64)
+    return _stack_boxes(_greedy_boxes(xs, ys, zs, grow_y=False, partition=True))
+
+def _greedy_boxes(xs, ys, zs, grow_y=True, partition=False):
+    # partition: one block high rectangles made like partition_layer, deeper than one row only when they reach
+    # the last row of their layer
+    if not len(xs):
+        return []
+    x0, y0, z0 = int(xs.min()), int(ys.min()), int(zs.min())
+    size_x = int(xs.max()) - x0 + 1
+    size_y = int(ys.max()) - y0 + 1
+    size_z = int(zs.max()) - z0 + 1
+
+    # Huge sparse groups are split into tiles, so the occupancy grid stays small
+    if size_x * size_y * size_z > GREEDY_MAX_CELLS and max(size_x, size_z) > 1:
+        if size_x >= size_z:
+            low = xs < x0 + size_x // 2
+        else:
+            low = zs < z0 + size_z // 2
+        high = ~low
+        return (_greedy_boxes(xs[low], ys[low], zs[low], grow_y, partition) +
+                _greedy_boxes(xs[high], ys[high], zs[high], grow_y, partition))
+
+    # Occupancy grid indexed [y, z, x], the seed loop reads and scans the bytearray behind it directly
+    layer = size_z * size_x
+    cells = bytearray(size_y * layer)
+    grid = numpy.frombuffer(cells, dtype=numpy.bool_).reshape(size_y, size_z, size_x)
+    seeds = numpy.unique((ys - y0) * layer + (zs - z0) * size_x + (xs - x0))
+    grid.reshape(-1)[seeds] = True
+    if partition:
+        last_rows = numpy.full(size_y, -1, dtype=numpy.int64)  # Last row (z) of every layer
+        numpy.maximum.at(last_rows, ys - y0, zs - z0)
+        last_rows = last_rows.tolist()
+
+    boxes = []
+    for index in seeds.tolist():
+        if not cells[index]:
+            continue
+        y, rest = divmod(index, layer)
+        z, x = divmod(rest, size_x)
+        # Grow along x up to the first free cell of the row, then along z and y while whole rows are filled
+        row_end = index - x + size_x
+        end = cells.find(0, index, row_end)
+        w = (row_end if end < 0 else end) - index
+        d = 1
+        row = index + size_x
+        while z + d < size_z and cells.find(0, row, row + w) < 0:
+            d += 1
+            row += size_x
+        if partition and z + d <= last_rows[y]:
+            d = 1
+        h = 1
+        if grow_y:
+            start = index + layer
+            while y + h < size_y and all(cells.find(0, row, row + w) < 0
+                                         for row in range(start, start + d * size_x, size_x)):
+                h += 1
+                start += layer
+        grid[y:y + h, z:z + d, x:x + w] = False
+        boxes.append((x + x0, y + y0, z + z0, w, h, d))
+    return boxes
+
+def _stack_boxes(boxes):
+    """
+    Joins one block high boxes (sorted by y) with the same rectangle in consecutive layers.
+    """
+    stacked = []
+    top = {}  # (min_x, min_z, size_x, size_z) -> index in stacked of the last box with that rectangle
+    for x, y, z, w, h, d in boxes:
+        key = (x, z, w, d)
+        index = top.get(key)
+        if index is not None and stacked[index][1] + stacked[index][4] == y:
+            box = stacked[index]
+            stacked[index] = (x, box[1], z, w, box[4] + 1, d)
+        else:
+            top[key] = len(stacked)
+            stacked.append((x, y, z, w, h, d))
+    return stacked
+
+def group_positions(blocks):
+    """
+    Groups blocks by block state.
+    blocks: VoxelStore or list of tuples (x, y, z, block_type, properties)
+    Returns a list of (block_type, properties, xs, ys, zs) in order of the first appearance of each state,
+    with the positions as NumPy arrays.
+    """
+    if not isinstance(blocks, VoxelStore):
+        blocks = VoxelStore.from_records(blocks)
+    result = []
+    order = numpy.argsort(blocks.state, kind="stable")
+    states = blocks.state[order]
+    bounds = numpy.flatnonzero(numpy.diff(states)) + 1
+    for part in numpy.split(order, bounds) if len(order) else []:
+        btype, props = blocks.palette[int(blocks.state[part[0]])]
+        result.append((part[0], btype, props, blocks.x[part], blocks.y[part], blocks.z[part]))
+    result.sort(key=lambda group: group[0])
+    return [group[1:] for group in result]
+
+def mesh_group(group, direction, method="greedy"):
+    """
+    Meshes one block state group (block_type, properties, xs, ys, zs), see group_positions.
+    Returns a list of cuboids: (min_x, min_y, min_z, size_x, size_y, size_z, block_type, properties)
+    """
+    btype, props, xs, ys, zs = group
+    if method == "greedy":
+        return [box + (btype, props) for box in greedy_mesh(xs, ys, zs, direction)]
+    layers = {}
+    for x, y, z in zip(xs.tolist(), ys.tolist(), zs.tolist()):
+        layers.setdefault(y, set()).add((x, z))
+    layer_rects = {y: partition_layer(coords) for y, coords in layers.items()}
+    if direction == "horizontal":
+        return merge_layers_horizontal(layer_rects, btype, props)
+    else:
+        return merge_layers_vertical(layer_rects, btype, props)
+
+def _mesh_both(group, method):
+    """
+    Meshes a group in both directions, see mesh_group. Returns (horizontal cuboids, vertical cuboids).
+    The layered boxes used by greedy_mesh are the same in both directions, they're only made once.
+    """
+    if method != "greedy":
+        return mesh_group(group, "horizontal", method), mesh_group(group, "vertical", method)
+    btype, props, xs, ys, zs = group
+    layered = layered_boxes(xs, ys, zs)
+    return tuple([box + (btype, props) for box in greedy_mesh(xs, ys, zs, direction, layered)]
+                 for direction in ("horizontal", "vertical"))
+
+def _optimize_group(group, direction, method):
+    """
+    Meshes a group in the given direction, or in both when direction is None keeping the one with fewer
+    cuboids. Returns (direction, cuboids).
+    """
+    if direction is not None:
+        return direction, mesh_group(group, direction, method)
+    horizontal, vertical = _mesh_both(group, method)
+    if len(horizontal) <= len(vertical):
+        return "horizontal", horizontal
+    else:
+        return "vertical", vertical
+
+def optimize_blocks(blocks, direction=None, method="greedy", workers=1):
     """
     Optimizes blocks by merging blocks with identical properties.
 
     Parameters:
-    blocks: list of tuples (x, y, z, block_type, properties)
+    blocks: VoxelStore or list of tuples (x, y, z, block_type, properties)
     direction (optional): "horizontal" or "vertical". If not specified,
-    we analyze the block to choose the best one.
+    both are tried once for every block state and the one giving fewer cuboids is kept for that state.
+    method: "greedy" (3D greedy meshing, see greedy_mesh) or "layers" (rectangles per layer merged between
+    layers, see partition_layer and merge_layers).
+    workers: number of processes meshing the block states in parallel (1 = serial).
 
     Returns a list of cuboids: (min_x, min_y, min_z, size_x, size_y, size_z, block_type, properties)
     """
-    if direction is None:
-        direction = analyze_blocks(blocks)
-        print(f"Selected optimization direction: {direction}")
-    
-    groups = {}
-    for bx, by, bz, btype, props in blocks:
-        key = (btype, frozenset(props.items()))
-        groups.setdefault(key, {}).setdefault(by, set()).add((bx, bz))
-    
-    merged_objs = []
-    for (btype, props_fs), layers in groups.items():
-        layer_rects = {}
-        for y, coords in layers.items():
-            rects = partition_layer(coords)
-            layer_rects[y] = rects
-        if direction == "horizontal":
-            merged_objs.extend(merge_layers_horizontal(layer_rects, btype, dict(props_fs)))
-        else:
-            merged_objs.extend(merge_layers_vertical(layer_rects, btype, dict(props_fs)))
-    
-    adjusted_objs = [adjust_pivot(obj, direction) for obj in merged_objs]
+    groups = group_positions(blocks)
+    if workers > 1 and len(groups) > 1:
+        chunksize = max(1, len(groups) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_optimize_group, groups, repeat(direction), repeat(method),
+                                        chunksize=chunksize))
+    else:
+        results = [_optimize_group(group, direction, method) for group in groups]
+
+    if direction is None and results:
+        vertical = sum(1 for chosen, _ in results if chosen == "vertical")
+        log.info(f"Selected optimization direction: horizontal for {len(results) - vertical} block states, "
+                 f"vertical for {vertical}")
+
+    adjusted_objs = []
+    for chosen, cuboids in results:
+        adjusted_objs.extend(adjust_pivot(obj, chosen) for obj in cuboids)
     return adjusted_objs
 
 from PyVMF import SolidGenerator, Vertex
-from MTS_block import TEXTURE_SCALE, compute_texture_config
+from MTS_block import apply_render_state, get_render_state
 
 def create_cuboid(vmf, x, y, z, dx, dy, dz, block_type, properties):
     """
     Creates a cuboid in VMF with position (x, y, z) and dimensions (dx, dy, dz).
+    See build_cuboid.
+    """
+    solid = build_cuboid(x, y, z, dx, dy, dz, block_type, properties)
+    vmf.add_solids(solid)
+    return solid
+
+def build_cuboid(x, y, z, dx, dy, dz, block_type, properties):
+    """
+    Builds a cuboid solid with position (x, y, z) and dimensions (dx, dy, dz), without adding it to a VMF.
+    Both are in Hammer axes, where z is up (Minecraft y), see MTS_world.cuboid_box.
     Sets textures and UVs to maintain default rotation.
 
     Assuming:
@@ -188,36 +364,10 @@ def create_cuboid(vmf, x, y, z, dx, dy, dz, block_type, properties):
     solid.side[1] is BOTTOM,
     solid.side[2]-[5] are SIDES.
     """
-    solid_gen = SolidGenerator()
-    vertex = Vertex(x, y, z)
-    try:
-        solid = solid_gen.cuboid(vertex, dx, dy, dz)
-    except AttributeError:
-        solid = solid_gen.cube(vertex, dx, dy, dz)
-    
-    texture_config, orientation = compute_texture_config(block_type, properties)
-    
-    if len(solid.side) >= 6:
-        # TOP
-        solid.side[0].material = texture_config.get("top", texture_config.get("sides", ""))
-        solid.side[0].uaxis = "[1 0 0 0] " + str(TEXTURE_SCALE)
-        solid.side[0].vaxis = "[0 -1 0 0] " + str(TEXTURE_SCALE)
-        # BOTTOM
-        solid.side[1].material = texture_config.get("bottom", texture_config.get("sides", ""))
-        solid.side[1].uaxis = "[1 0 0 0] " + str(TEXTURE_SCALE)
-        solid.side[1].vaxis = "[0 -1 0 0] " + str(TEXTURE_SCALE)
-        # Boki
-        for i in range(2, 6):
-            solid.side[i].material = texture_config.get("sides", texture_config.get("all", ""))
-            solid.side[i].uaxis = "[0 1 0 0] " + str(TEXTURE_SCALE)
-            solid.side[i].vaxis = "[0 0 -1 0] " + str(TEXTURE_SCALE)
-    else:
-        for side in solid.side:
-            side.material = texture_config.get("all", texture_config.get("sides", ""))
-            side.uaxis = "[1 0 0 0] " + str(TEXTURE_SCALE)
-            side.vaxis = "[0 -1 0 0] " + str(TEXTURE_SCALE)
+    solid = SolidGenerator.cube(Vertex(x, y, z), dx, dy, dz)
+    apply_render_state(solid, get_render_state(block_type, properties, cuboid=True))
     
-    vmf.world.solids.append(solid)
+    return solid
 
 # Optional testing
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+# MTS_progress.py
+import cProfile
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+try:
+    import resource  # Peak RSS, not available on Windows
+except ImportError:
+    resource = None
+
+log = logging.getLogger(__name__)
+
+# Seconds between two progress events while the counters change
+PROGRESS_INTERVAL = 0.1
+# Counters of a conversion, bytes_written is the size of the VMF file written so far
+COUNTERS = ("chunks_total", "chunks_scanned", "blocks_found", "unique_states", "cuboids", "brushes_emitted", "sides",
+            "bytes_written")
+# Stage names used in events, reports and profiling options, with the text shown for them
+STAGES = {
+    "load": "Loading world",
+    "scan": "Scanning chunks",
+    "cull": "Culling hidden blocks",
+    "texture": "Resolving textures",
+    "optimize": "Block optimization",
+    "build": "Building brushes",
+    "export": "Saving VMF file",
+    "bounds": "Finding area bounds",
+    "stream": "Converting chunk by chunk",
+    "done": "Done",
+}
+# Lines of the tracemalloc capture kept in the report
+TRACEMALLOC_TOP = 20
+
+# stage: name of the current stage (see STAGES), counters: {name: value} (see COUNTERS), elapsed: seconds since the
+# conversion started, finished: True for the last event of the conversion
+ProgressEvent = namedtuple("ProgressEvent", ["stage", "counters", "elapsed", "finished"])
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of the process in bytes, or None where it isn't available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Kilobytes on Linux
+
+
+def _cpu_times():
+    times = os.times()
+    return times.user + times.system, times.children_user + times.children_system
+
+
+class ConversionProgress:
+    """
+    Progress of a conversion, reported to subscribers (the GUI, the CLI) as ProgressEvent.
+    An event is sent when a stage starts, then at most once every `interval` seconds while counters change,
+    and a last one when the conversion is finished, so the conversion never waits on terminal or UI output.
+    Stages are logged at INFO level, per-item details are only logged at DEBUG level by the conversion modules.
+
+    Every stage is also timed (wall and CPU time, CPU time of the worker processes, peak RSS), see report.
+    profile and trace_memory name a stage to capture with cProfile and tracemalloc, the profile is written to
+    profile_path and the largest allocations are kept in the report.
+    """
+
+    def __init__(self, interval=PROGRESS_INTERVAL, profile=None, trace_memory=None, profile_path=None):
+        self.interval = interval
+        self.stage = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.stages = []  # {"name", "wall", "cpu", "cpu_children", "peak_rss"} of the finished stages
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.profile_path = profile_path
+        self.memory = None  # tracemalloc capture, see _end_stage
+        self._subscribers = []
+        self._start = time.perf_counter()
+        self._end = None  # perf_counter time of finish
+        self._cpu_start = _cpu_times()
+        self._stage_start = None  # (perf_counter, cpu times) of the current stage
+        self._profiler = None
+        self._next = 0.0  # perf_counter time of the next throttled event
+
+    def subscribe(self, callback):
+        """
+        Adds a callback called with every ProgressEvent, returns it.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def start_stage(self, stage):
+        """
+        Ends the current stage and starts a new one, stage is one of STAGES.
+        """
+        now = time.perf_counter()
+        self._end_stage(now)
+        self.stage = stage
+        self._stage_start = now, _cpu_times()
+        log.info(STAGES[stage])
+        if stage == self.trace_memory:
+            tracemalloc.start()
+        if stage == self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._emit(now)
+
+    def add(self, **counts):
+        """
+        Adds to counters, ex: add(chunks_scanned=1, blocks_found=len(blocks)).
+        """
+        counters = self.counters
+        for name, count in counts.items():
+            counters[name] += count
+        now = time.perf_counter()
+        if now >= self._next:
+            self._emit(now)
+
+    def set(self, **values):
+        """
+        Sets counters, ex: set(bytes_written=size).
+        """
+        self.counters.update(values)
+        now = time.perf_counter()
+        if now >= self._next:
+            self._emit(now)
+
+    def finish(self):
+        now = self._end = time.perf_counter()
+        self._end_stage(now)
+        self.stage = "done"
+        log.info(f"Done in {now - self._start:.2f} seconds")
+        self._emit(now, finished=True)
+
+    def _end_stage(self, now):
+        if self._stage_start is None:
+            return
+        start, (cpu, cpu_children) = self._stage_start
+        cpu_end, cpu_children_end = _cpu_times()
+        self.stages.append({"name": self.stage, "wall": now - start, "cpu": cpu_end - cpu,
+                            "cpu_children": cpu_children_end - cpu_children, "peak_rss": peak_rss()})
+        self._stage_start = None
+
+        if self._profiler is not None:
+            self._profiler.disable()
+            if self.profile_path is not None:
+                self._profiler.dump_stats(self.profile_path)
+                log.info(f"Saved the {self.stage} profile to {self.profile_path}")
+            self._profiler = None
+        if self.stage == self.trace_memory and tracemalloc.is_tracing():
+            top = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP]
+            self.memory = {
+                "stage": self.stage,
+                "peak": tracemalloc.get_traced_memory()[1],
+                "top": [{"where": str(stat.traceback[0]), "size": stat.size, "count": stat.count} for stat in top],
+            }
+            tracemalloc.stop()
+
+    def _emit(self, now, finished=False):
+        self._next = now + self.interval
+        event = ProgressEvent(self.stage, dict(self.counters), now - self._start, finished)
+        for callback in self._subscribers:
+            callback(event)
+
+    def report(self, **info):
+        """
+        Returns the run report as a dict: the stages, the counters and totals, with info (conversion settings)
+        added as they are.
+        """
+        cpu, cpu_children = _cpu_times()
+        report = {
+            "info": info,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "wall": (self._end or time.perf_counter()) - self._start,
+            "cpu": cpu - self._cpu_start[0],
+            "cpu_children": cpu_children - self._cpu_start[1],
+            "peak_rss": peak_rss(),
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+        if self.profile is not None:
+            report["profile"] = {"stage": self.profile, "path": self.profile_path}
+        if self.memory is not None:
+            report["tracemalloc"] = self.memory
+        return report
+
+    def write_report(self, path, **info):
+        """
+        Writes the run report (see report) to a JSON file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(**info), file, indent=2)
+        log.info(f"Saved the run report to {path}")
+
+
+def format_event(event):
+    """
+    One line summary of a ProgressEvent, used by the CLI.
+    """
+    counters = event.counters
+    line = f"[{event.elapsed:7.1f}s] {STAGES.get(event.stage, event.stage)}"
+    if counters["chunks_total"]:
+        line += f" | chunks {counters['chunks_scanned']}/{counters['chunks_total']}"
+    if counters["blocks_found"]:
+        line += f" | blocks {counters['blocks_found']}"
+    if counters["brushes_emitted"]:
+        line += f" | brushes {counters['brushes_emitted']}"
+    if counters["bytes_written"]:
+        line += f" | {counters['bytes_written'] / 1e6:.1f} MB written"
+    return line
@@ -0,0 +1,213 @@
+# MTS_textures.py
+import json
+import logging
+import os
+import sys
+
+# Texture rules shipped with MTS
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "texture_rules.json")
+# Extra rule files loaded on top of the bundled ones, separated like PATH
+RULES_ENV_VAR = "MTS_TEXTURE_RULES"
+
+FACES = ("top", "sides", "bottom")
+
+log = logging.getLogger(__name__)
+
+
+class TextureRule:
+    """
+    Compiled texture rule. A rule reads block properties into variables, optionally switches to other rules
+    depending on a property value, and fills face texture templates with the variables.
+
+    Rule format (JSON):
+        "properties":   {name: default} or {name: {"default": ..., "choices": [...], "range": [min, max]}}
+        "vars":         literal variables, {name: value}
+        "texture":      template used for the top, sides and bottom faces
+        "top", "sides", "bottom": template of a single face, overrides "texture"
+        "all":          one texture for the whole block (rotated with "orientation")
+        "orientation":  name of the variable holding the axis, or
+                        {"facing": variable, "rotations": {value: degrees}}
+        "switch":       [{"property": name, "cases": {"value|other_value": rule}}], the matching case rule is
+                        applied on top of this one
+        "strip_prefix": prefix removed from the block name before it's used as {name}
+    Templates are str.format strings, {name} is the block name without the "minecraft:" namespace.
+    """
+
+    def __init__(self, data):
+        self.properties = []  # (name, default, choices, range)
+        for name, spec in data.get("properties", {}).items():
+            if isinstance(spec, dict):
+                choices = spec.get("choices")
+                self.properties.append((name, str(spec.get("default", "")).lower(),
+                                        frozenset(choices) if choices is not None else None,
+                                        tuple(spec["range"]) if "range" in spec else None))
+            else:
+                self.properties.append((name, str(spec).lower(), None, None))
+        self.vars = dict(data.get("vars", {}))
+        self.faces = {}
+        if "texture" in data:
+            self.faces = {face: data["texture"] for face in FACES}
+        for face in FACES + ("all",):
+            if face in data:
+                self.faces[face] = data[face]
+        self.orientation = data.get("orientation")
+        self.strip_prefix = data.get("strip_prefix", "")
+        self.switch = []  # (property, {value: TextureRule})
+        for entry in data.get("switch", []):
+            cases = {}
+            for values, case in entry["cases"].items():
+                rule = TextureRule(case)
+                for value in values.split("|"):
+                    cases[value] = rule
+            self.switch.append((entry["property"], cases))
+
+    def _read_properties(self, properties, values):
+        for name, default, choices, value_range in self.properties:
+            value = str(properties.get(name, default)).lower()
+            if choices is not None and value not in choices:
+                value = default
+            if value_range is not None:
+                value = str(max(value_range[0], min(value_range[1], int(value))))
+            values[name] = value
+
+    def _apply(self, properties, values, faces):
+        self._read_properties(properties, values)
+        values.update(self.vars)
+        faces.update(self.faces)
+        for name, cases in self.switch:
+            case = cases.get(values.get(name))
+            if case is not None:
+                case._apply(properties, values, faces)
+
+    def resolve(self, short_name, properties, base_path):
+        """
+        Returns (texture_config, orientation) of a block, see compute_texture_config in MTS_block.
+        """
+        if self.strip_prefix and short_name.startswith(self.strip_prefix):
+            short_name = short_name[len(self.strip_prefix):]
+        values = {"name": short_name}
+        faces = {}
+        self._apply(properties, values, faces)
+
+        # Material paths are interned, so equal textures of different block states share one string
+        if "all" in faces:
+            config = {"all": sys.intern(base_path + faces["all"].format(**values))}
+        else:
+            config = {face: sys.intern(base_path + faces.get(face, "{name}").format(**values)) for face in FACES}
+
+        orientation = None
+        if isinstance(self.orientation, dict):
+            facing = values[self.orientation["facing"]]
+            orientation = {"rotation": self.orientation.get("rotations", {}).get(facing, 0), "facing": facing}
+        elif self.orientation is not None:
+            orientation = values[self.orientation]
+        return config, orientation
+
+
+class TextureRegistry:
+    """
+    Maps block names to texture rules. Rules come from JSON files with "exact", "prefix", "suffix" and
+    "contains" sections, later files (overlays) take precedence over earlier ones.
+
+    Names are matched against the exact table first, then prefixes, suffixes and finally the "contains"
+    families in file order. Exact names, prefixes and suffixes are hash lookups, and the rule found for
+    a name is remembered, so each block name is matched only once.
+    """
+
+    def __init__(self):
+        self.base_path = ""
+        self.default = TextureRule({"texture": "{name}"})
+        self._exact = {}     # name -> TextureRule
+        self._prefix = {}    # length -> {prefix: TextureRule}
+        self._suffix = {}    # length -> {suffix: TextureRule}
+        self._contains = []  # (substrings, TextureRule)
+        self._matches = {}   # short name -> TextureRule
+
+    def load(self, path):
+        """
+        Loads rules from a JSON file on top of the current ones.
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            self.update(json.load(file))
+        log.info(f"Loaded texture rules from {path}")
+
+    def update(self, rules):
+        """
+        Adds rules given as a dict in the JSON file format, replacing rules of the same names.
+        """
+        if "base_path" in rules:
+            self.base_path = rules["base_path"]
+        if "default" in rules:
+            self.default = TextureRule(rules["default"])
+        for names, data in rules.get("exact", {}).items():
+            rule = TextureRule(data)
+            for name in names.split("|"):
+                self._exact[name] = rule
+        for section, table in (("prefix", self._prefix), ("suffix", self._suffix)):
+            for entry in rules.get(section, []):
+                rule = TextureRule(entry)
+                for affix in _as_list(entry["match"]):
+                    table.setdefault(len(affix), {})[affix] = rule
+        # Overlay families are checked before the ones already loaded
+        families = [(tuple(_as_list(entry["match"])), TextureRule(entry)) for entry in rules.get("contains", [])]
+        self._contains = families + self._contains
+        self._matches.clear()
+
+    def match(self, short_name):
+        """
+        Returns the rule used for a block name (without the "minecraft:" namespace).
+        """
+        rule = self._matches.get(short_name)
+        if rule is None:
+            rule = self._find(short_name)
+            self._matches[short_name] = rule
+        return rule
+
+    def _find(self, short_name):
+        rule = self._exact.get(short_name)
+        if rule is not None:
+            return rule
+        # Longest prefix or suffix wins
+        for length in sorted(self._prefix, reverse=True):
+            rule = self._prefix[length].get(short_name[:length])
+            if rule is not None:
+                return rule
+        for length in sorted(self._suffix, reverse=True):
+            if length <= len(short_name):
+                rule = self._suffix[length].get(short_name[len(short_name) - length:])
+                if rule is not None:
+                    return rule
+        for substrings, rule in self._contains:
+            if any(substring in short_name for substring in substrings):
+                return rule
+        return self.default
+
+    def texture_config(self, block_name, properties):
+        """
+        Returns (texture_config, orientation) of a block.
+        """
+        short_name = block_name.split(":")[-1]
+        return self.match(short_name).resolve(short_name, properties, self.base_path)
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+_registry = None
+
+
+def get_texture_registry():
+    """
+    Returns the shared registry, loading the bundled rules and the files listed in MTS_TEXTURE_RULES
+    on first use.
+    """
+    global _registry
+    if _registry is None:
+        registry = TextureRegistry()
+        registry.load(DEFAULT_RULES_FILE)
+        for path in os.environ.get(RULES_ENV_VAR, "").split(os.pathsep):
+            if path:
+                registry.load(path)
+        _registry = registry
+    return _registry
@@ -0,0 +1,173 @@
+# MTS_voxels.py
+import numpy
+
+
+class BlockPalette:
+    """
+    Interned table of block states. Every unique (block_name, properties) pair is stored once
+    and referred to by its index.
+    """
+
+    def __init__(self):
+        self.states = []  # list of (block_name, properties)
+        self._index = {}  # (block_name, frozenset(properties.items())) -> index in states
+
+    def __len__(self):
+        return len(self.states)
+
+    def __getitem__(self, index):
+        return self.states[index]
+
+    def intern(self, block_name, properties):
+        """
+        Returns the index of the block state, adding it to the table if it's new.
+        """
+        key = (block_name, frozenset(properties.items()))
+        index = self._index.get(key)
+        if index is None:
+            index = len(self.states)
+            self._index[key] = index
+            self.states.append((block_name, properties))
+        return index
+
+    def index_dtype(self):
+        """
+        The smallest unsigned integer type able to index the table.
+        """
+        return numpy.uint16 if len(self.states) <= 0x10000 else numpy.uint32
+
+
+class VoxelStore:
+    """
+    Columnar container of blocks, used between the scan, culling, optimization and export stages
+    instead of a list of (x, y, z, block_name, properties) tuples.
+
+    Coordinates are kept in NumPy arrays (x and z as int32, y as int16) together with an index into a shared
+    :class:`BlockPalette`, so a block costs 12 bytes instead of a tuple with its own properties dict.
+    Iterating the store still yields the (x, y, z, block_name, properties) tuples.
+    """
+
+    def __init__(self, palette=None, x=None, y=None, z=None, state=None):
+        self.palette = palette if palette is not None else BlockPalette()
+        self._parts = []  # Appended arrays not yet joined, see _consolidate
+        if x is None:
+            x, y, z, state = [], [], [], []
+        self._x = numpy.asarray(x, dtype=numpy.int32)
+        self._y = numpy.asarray(y, dtype=numpy.int16)
+        self._z = numpy.asarray(z, dtype=numpy.int32)
+        self._state = numpy.asarray(state, dtype=self.palette.index_dtype())
+
+    @classmethod
+    def from_records(cls, blocks, palette=None):
+        """
+        Builds a store from an iterable of (x, y, z, block_name, properties) tuples.
+        """
+        store = cls(palette)
+        xs, ys, zs, states = [], [], [], []
+        for x, y, z, block_name, properties in blocks:
+            xs.append(x)
+            ys.append(y)
+            zs.append(z)
+            states.append(store.palette.intern(block_name, properties))
+        store.append(xs, ys, zs, states)
+        return store
+
+    @classmethod
+    def concatenate(cls, stores, palette=None):
+        """
+        Joins stores in order into a new one. Stores using another palette than the result get their
+        state indices remapped.
+        """
+        if palette is None:
+            palette = stores[0].palette if stores else BlockPalette()
+        result = cls(palette)
+        for store in stores:
+            states = store.state
+            if store.palette is not palette and len(store):
+                remap = numpy.array([palette.intern(*state) for state in store.palette.states], dtype=numpy.uint32)
+                states = remap[states]
+            result.append(store.x, store.y, store.z, states)
+        return result
+
+    def append(self, x, y, z, state):
+        """
+        Adds blocks given as coordinate and palette index arrays.
+        """
+        if len(x):
+            self._parts.append((x, y, z, state))
+
+    def _consolidate(self):
+        if self._parts:
+            parts = [(self._x, self._y, self._z, self._state)] + self._parts
+            self._parts = []
+            self._x = numpy.concatenate([p[0] for p in parts]).astype(numpy.int32, copy=False)
+            self._y = numpy.concatenate([p[1] for p in parts]).astype(numpy.int16, copy=False)
+            self._z = numpy.concatenate([p[2] for p in parts]).astype(numpy.int32, copy=False)
+            self._state = numpy.concatenate([p[3] for p in parts]).astype(self.palette.index_dtype(), copy=False)
+
+    @property
+    def x(self):
+        self._consolidate()
+        return self._x
+
+    @property
+    def y(self):
+        self._consolidate()
+        return self._y
+
+    @property
+    def z(self):
+        self._consolidate()
+        return self._z
+
+    @property
+    def state(self):
+        self._consolidate()
+        return self._state
+
+    def __len__(self):
+        return len(self._x) + sum(len(part[0]) for part in self._parts)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        states = self.palette.states
+        for x, y, z, state in zip(self.x.tolist(), self.y.tolist(), self.z.tolist(), self.state.tolist()):
+            block_name, properties = states[state]
+            yield x, y, z, block_name, properties
+
+    def select(self, mask):
+        """
+        Returns a new store (sharing the palette) with only the blocks where the boolean mask is True.
+        """
+        return VoxelStore(self.palette, self.x[mask], self.y[mask], self.z[mask], self.state[mask])
+
+    def bounds(self):
+        """
+        Returns (min_x, min_y, min_z, max_x, max_y, max_z) of the blocks.
+        """
+        return (int(self.x.min()), int(self.y.min()), int(self.z.min()),
+                int(self.x.max()), int(self.y.max()), int(self.z.max()))
+
+    def state_order(self):
+        """
+        Returns the palette indices used by the store, in order of their first appearance.
+        """
+        states, first = numpy.unique(self.state, return_index=True)
+        return states[numpy.argsort(first, kind="stable")].tolist()
+
+    def state_lookup(self, function, dtype=bool):
+        """
+        Evaluates function(block_name, properties) once per palette entry and returns the results per block.
+        """
+        table = numpy.array([function(*state) for state in self.palette.states], dtype=dtype)
+        if not len(table):
+            return numpy.zeros(0, dtype=dtype)
+        return table[self.state]
+
+    def nbytes(self):
+        """
+        Memory used by the block arrays in bytes (the palette is not included).
+        """
+        return self.x.nbytes + self.y.nbytes + self.z.nbytes + self.state.nbytes
@@ -1,196 +1,497 @@
 # MTS_world.py
 import logging
+import os
+import numpy
 from amulet import load_format
 from amulet.api.level import World, Structure
 from amulet.api.wrapper.world_format_wrapper import WorldFormatWrapper
 from amulet.api.wrapper.structure_format_wrapper import StructureFormatWrapper
 from amulet.api.errors import ChunkDoesNotExist, DimensionDoesNotExist
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Union
-from MTS_block import BLOCK_SIZE, compute_texture_config, create_block
+from MTS_block import BLOCK_SIZE, adjust_orientation, build_block, get_render_state
 from PyVMF import VMF, World as VMFWorld
-from MTS_optimization import optimize_blocks, create_cuboid 
+from MTS_optimization import optimize_blocks, build_cuboid
+from MTS_culling import TRANSPARENT_BLOCKS, cull_hidden_blocks
+from MTS_voxels import BlockPalette, VoxelStore
+from MTS_progress import ConversionProgress
 
 log = logging.getLogger(__name__)
 
+# World height range scanned for blocks (inclusive)
+MIN_Y = -64
+MAX_Y = 319
+SKIPPED_BLOCKS = ("air", "cave_air", "void_air", "barrier")
+# Anvil region files hold 32x32 chunks, parallel scan batches are aligned to them
+REGION_CHUNKS = 32
+
 def load_level(path: str) -> Union[World, Structure]:
     log.info(f"Loading level {path}")
     format_wrapper = load_format(path)
-    print(f"FormatWrapper type: {type(format_wrapper).__name__}")
+    log.debug(f"FormatWrapper type: {type(format_wrapper).__name__}")
     if isinstance(format_wrapper, WorldFormatWrapper):
         try:
             world = World(path, format_wrapper)
-            print(f"World initialized successfully: {world}")
+            log.debug(f"World initialized successfully: {world}")
             return world
         except Exception as e:
-            print(f"Error during World initialization: {e}")
+            log.error(f"Error during World initialization: {e}")
             raise e
     elif isinstance(format_wrapper, StructureFormatWrapper):
         try:
             structure = Structure(path, format_wrapper)
-            print(f"Structure initialized successfully: {structure}")
+            log.debug(f"Structure initialized successfully: {structure}")
             return structure
         except Exception as e:
-            print(f"Error during Structure initialization: {e}")
+            log.error(f"Error during Structure initialization: {e}")
             raise e
     else:
         raise Exception(
             f"FormatWrapper of type {format_wrapper.__class__.__name__} is not supported. Report this to a developer."
         )
 
-def get_surface_blocks(world_path, x1, z1, x2, z2, dimension='minecraft:overworld'):
+def _lookup_state(level_palette, index, palette, state_cache):
+    """
+    Returns the index in palette (a BlockPalette) of a level palette index, or -1 for skipped blocks (see SKIPPED_BLOCKS).
+    Each level palette entry is resolved only once per scan - amulet chunks of a level share the level block palette,
+    so the cache is keyed by the level palette index alone.
+    """
+    if index not in state_cache:
+        block = level_palette[index]
+        if block.base_name in SKIPPED_BLOCKS:
+            state_cache[index] = -1
+        else:
+            state_cache[index] = palette.intern(block.base_name, block.properties)
+    return state_cache[index]
+
+def scan_chunk(chunk, cx, cz, start_x, end_x, start_z, end_z, palette, state_cache):
+    """
+    Reads the sub-chunk arrays of a chunk as one NumPy volume and returns the blocks (excluding SKIPPED_BLOCKS)
+    in the local range [start_x, end_x) x [start_z, end_z) as a VoxelStore using the given palette.
+    Blocks are ordered like the per-voxel loop: x, then z, then y from the top down.
+    """
+    if end_x <= start_x or end_z <= start_z:
+        return VoxelStore(palette)
+    blocks = chunk.blocks
+    # Volume indexed [x, y - MIN_Y, z], missing sub-chunks keep palette index 0
+    volume = numpy.zeros((end_x - start_x, MAX_Y - MIN_Y + 1, end_z - start_z), dtype=numpy.uint32)
+    for cy in range(MIN_Y >> 4, (MAX_Y >> 4) + 1):
+        if blocks.has_sub_chunk(cy):
+            y0 = cy * 16 - MIN_Y
+            volume[:, y0:y0 + 16, :] = blocks.get_sub_chunk(cy)[start_x:end_x, :, start_z:end_z]
+
+    unique = numpy.unique(volume)
+    states = numpy.array([_lookup_state(chunk.block_palette, index, palette, state_cache) for index in unique.tolist()])
+    if (states < 0).all():
+        return VoxelStore(palette)
+
+    # Reorder to [x, z, y descending] so that nonzero() yields the blocks in scan order
+    ordered = numpy.searchsorted(unique, volume.transpose(0, 2, 1)[:, :, ::-1])
+    ordered = states[ordered]
+    xs, zs, ys = numpy.nonzero(ordered >= 0)
+    return VoxelStore(palette, xs + cx * 16 + start_x, MAX_Y - ys, zs + cz * 16 + start_z, ordered[xs, zs, ys])
+
+def get_chunk_jobs(x1, z1, x2, z2):
+    """
+    Splits the area into chunks.
+    Returns a list of (cx, cz, start_x, end_x, start_z, end_z) tuples in scan order,
+    where the start/end values are the local x/z range of the chunk inside the area.
+    """
+    cx1, cz1 = x1 // 16, z1 // 16
+    cx2, cz2 = x2 // 16, z2 // 16
+    jobs = []
+    for cx in range(min(cx1, cx2), max(cx1, cx2) + 1):
+        for cz in range(min(cz1, cz2), max(cz1, cz2) + 1):
+            start_x = max(0, x1 - cx * 16) if cx == cx1 else 0
+            end_x = min(16, x2 - cx * 16 + 1) if cx == cx2 else 16
+            start_z = max(0, z1 - cz * 16) if cz == cz1 else 0
+            end_z = min(16, z2 - cz * 16 + 1) if cz == cz2 else 16
+            jobs.append((cx, cz, start_x, end_x, start_z, end_z))
+    return jobs
+
+def scan_chunks(world, jobs, dimension, palette, state_cache):
+    """
+    Scans the given chunk jobs (see get_chunk_jobs) of an opened level.
+    Yields ((cx, cz), VoxelStore) for every existing chunk, in job order. All stores share the given palette.
+    """
+    for cx, cz, start_x, end_x, start_z, end_z in jobs:
+        try:
+            log.debug("Processing chunk at (%d, %d) in dimension %s", cx, cz, dimension)
+            chunk = world.get_chunk(cx, cz, dimension)
+        except ChunkDoesNotExist:
+            log.debug("Chunk at (%d, %d) does not exist. Skipping.", cx, cz)
+            continue
+        except DimensionDoesNotExist:
+            log.warning(f"Dimension {dimension} does not exist. Skipping.")
+            return
+        yield (cx, cz), scan_chunk(chunk, cx, cz, start_x, end_x, start_z, end_z, palette, state_cache)
+
+def _scan_batch(world_path, jobs, dimension):
+    """
+    Worker of the parallel scan - opens its own copy of the level and scans one batch of chunks.
+    """
+    world = load_level(world_path)
+    try:
+        return list(scan_chunks(world, jobs, dimension, BlockPalette(), {}))
+    finally:
+        _close_level(world)
+
+def _close_level(world):
+    """
+    Closes an opened level, errors are only logged.
+    """
+    try:
+        world.close()
+    except Exception as e:
+        log.warning(f"Error closing world: {e}")
+
+def split_region_batches(jobs, workers=1):
+    """
+    Groups chunk jobs by the region file they belong to, so every worker reads whole regions.
+    When there are fewer regions than workers, regions are split into runs of consecutive jobs (never mixing
+    two regions), in proportion to their number of jobs, so that all the workers get a batch.
+    Returns the batches ordered by region position.
+    """
+    regions = {}
+    for job in jobs:
+        regions.setdefault((job[0] // REGION_CHUNKS, job[1] // REGION_CHUNKS), []).append(job)
+    batches = []
+    for key in sorted(regions):
+        region = regions[key]
+        parts = 1 if len(regions) >= workers else min(len(region), -(-workers * len(region) // len(jobs)))
+        size = -(-len(region) // parts)
+        batches.extend(region[start:start + size] for start in range(0, len(region), size))
+    return batches
+
+def _get_surface_blocks_parallel(world_path, jobs, dimension, workers, progress):
+    """
+    Scans region-aligned batches of chunks in a process pool and merges the results in scan order,
+    so the output is identical to the serial scan.
+    """
+    batches = split_region_batches(jobs, workers)
+    log.info(f"Scanning {len(jobs)} chunks in {len(batches)} region batches with {workers} workers")
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        futures = {executor.submit(_scan_batch, world_path, batch, dimension): batch for batch in batches}
+        for future in as_completed(futures):
+            found = future.result()
+            results.update(found)
+            progress.add(chunks_scanned=len(futures[future]), blocks_found=sum(len(store) for _, store in found))
+
+    stores = [results[(cx, cz)] for cx, cz, *_ in jobs if (cx, cz) in results]
+    return VoxelStore.concatenate(stores, BlockPalette())
+
+def get_surface_blocks(world_path, x1, z1, x2, z2, dimension='minecraft:overworld', workers=1, progress=None):
     """
-    Iterates through all chunks in a given area and returns a list of blocks
+    Iterates through all chunks in a given area and returns a VoxelStore of blocks
     (excluding air and barrier) along with their coordinates and properties.
     Height range: 319 to -64.
+    If workers is greater than 1, chunks are scanned in parallel processes, each with its own opened level.
+    Scanned chunks and found blocks are counted in progress (a ConversionProgress).
     """
+    if progress is None:
+        progress = ConversionProgress()
+    jobs = get_chunk_jobs(x1, z1, x2, z2)
+    progress.set(chunks_total=len(jobs), chunks_scanned=0, blocks_found=0)
+    progress.start_stage("load")
     try:
-        print(f"Loading world from: {world_path}")
+        log.info(f"Loading world from: {world_path}")
         world = load_level(world_path)
     except Exception as e:
-        print(f"Error loading world: {e}")
-        return []
-    
-    surface_blocks = []
-    cx1, cz1 = x1 // 16, z1 // 16
-    cx2, cz2 = x2 // 16, z2 // 16
+        log.error(f"Error loading world: {e}")
+        return VoxelStore()
 
-    total_chunks = (max(cx1, cx2) - min(cx1, cx2) + 1) * (max(cz1, cz2) - min(cz1, cz2) + 1)
-    processed_chunks = 0
+    if workers > 1 and len(jobs) > 1:
+        # The level was only opened to fail like the serial scan, every worker opens its own
+        _close_level(world)
+        progress.start_stage("scan")
+        return _get_surface_blocks_parallel(world_path, jobs, dimension, workers, progress)
 
-    print(f"Total chunks to process: {total_chunks}")
-    for cx in range(min(cx1, cx2), max(cx1, cx2) + 1):
-        for cz in range(min(cz1, cz2), max(cz1, cz2) + 1):
-            try:
-                print(f"Processing chunk at ({cx}, {cz}) in dimension {dimension}")
-                chunk = world.get_chunk(cx, cz, dimension)
-                start_x = max(0, x1 - cx * 16) if cx == cx1 else 0
-                end_x = min(16, x2 - cx * 16 + 1) if cx == cx2 else 16
-                start_z = max(0, z1 - cz * 16) if cz == cz1 else 0
-                end_z = min(16, z2 - cz * 16 + 1) if cz == cz2 else 16
-
-                for x in range(start_x, end_x):
-                    for z in range(start_z, end_z):
-                        for y in range(319, -65, -1):
-                            block = chunk.get_block(x, y, z)
-                            if block.base_name not in ["air", "barrier"]:
-                                world_x = cx * 16 + x
-                                world_z = cz * 16 + z
-                                surface_blocks.append((world_x, y, world_z, block.base_name, block.properties))
-                                print(f"Found {block.base_name} at ({world_x}, {y}, {world_z})")
-                processed_chunks += 1
-                print(f"Processed {processed_chunks}/{total_chunks} chunks")
-            except ChunkDoesNotExist:
-                print(f"Chunk at ({cx}, {cz}) does not exist. Skipping.")
-            except DimensionDoesNotExist:
-                print(f"Dimension {dimension} does not exist. Skipping.")
-                break
+    progress.start_stage("scan")
+    palette = BlockPalette()
+    stores = []
+    for _, found in scan_chunks(world, jobs, dimension, palette, {}):
+        stores.append(found)
+        progress.add(chunks_scanned=1, blocks_found=len(found))
+    progress.set(chunks_scanned=len(jobs))  # Including the chunks that don't exist
+
+    _close_level(world)
+    return VoxelStore.concatenate(stores, palette)
+
+def get_block_bounds(blocks):
+    """
+    Returns (min_x, min_y, min_z, max_x, max_y, max_z) of a VoxelStore or a list of (x, y, z, block_type, properties) blocks.
+    """
+    if isinstance(blocks, VoxelStore):
+        return blocks.bounds()
+    return (min(x for x, _, _, _, _ in blocks),
+            min(y for _, y, _, _, _ in blocks),
+            min(z for _, _, z, _, _ in blocks),
+            max(x for x, _, _, _, _ in blocks),
+            max(y for _, y, _, _, _ in blocks),
+            max(z for _, _, z, _, _ in blocks))
+
+def merge_bounds(bounds, other):
+    """
+    Returns the bounds (see get_block_bounds) enclosing both given bounds, either of them can be None.
+    """
+    if bounds is None:
+        return other
+    if other is None:
+        return bounds
+    return (*(min(a, b) for a, b in zip(bounds[:3], other[:3])),
+            *(max(a, b) for a, b in zip(bounds[3:], other[3:])))
+
+def block_positions(blocks, bounds, mirror_axis=None):
+    """
+    Computes the Hammer positions of "raw" blocks (a VoxelStore) as array operations.
+    The blocks are placed relative to the minimum of bounds (see get_block_bounds) and mirrored inside them.
+    Returns the x, y and z position lists.
+    """
+    return tuple(position.tolist() for position in block_position_arrays(blocks, bounds, mirror_axis))
+
+def block_position_arrays(blocks, bounds, mirror_axis=None):
+    """
+    Same as block_positions, but returns the x, y and z positions as NumPy arrays.
+    """
+    min_x, min_y, min_z, max_x, _, max_z = bounds
+    x = blocks.x.astype(numpy.int64)
+    z = blocks.z.astype(numpy.int64)
+    if mirror_axis == "x":
+        hammer_x = (max_x - x) * BLOCK_SIZE
+        hammer_y = (z - min_z) * BLOCK_SIZE
+    elif mirror_axis == "y":
+        hammer_x = (x - min_x) * BLOCK_SIZE
+        hammer_y = (max_z - z) * BLOCK_SIZE
+    else:
+        hammer_x = (x - min_x) * BLOCK_SIZE
+        hammer_y = (z - min_z) * BLOCK_SIZE
+    hammer_z = (blocks.y.astype(numpy.int64) - min_y) * BLOCK_SIZE
+    return hammer_x, hammer_y, hammer_z
+
+def iter_block_solids(blocks, bounds, mirror_axis=None):
+    """
+    Builds the solids of "raw" blocks - a VoxelStore or a list of (x, y, z, block_type, properties).
+    See block_positions for the placement.
+    """
+    if not isinstance(blocks, VoxelStore):
+        blocks = VoxelStore.from_records(blocks)
+    # Render states are looked up once per palette entry
+    render_states = [get_render_state(block_type, properties, mirror_axis) for block_type, properties in blocks.palette.states]
+    states = blocks.palette.states
+    for hammer_x, hammer_y, hammer_z, state in zip(*block_positions(blocks, bounds, mirror_axis), blocks.state.tolist()):
+        yield build_block(hammer_x, hammer_y, hammer_z, states[state][0], render_state=render_states[state])
+
+def add_block_boxes(boxes, blocks, bounds, mirror_axis=None):
+    """
+    Adds "raw" blocks (a VoxelStore or a list of (x, y, z, block_type, properties)) to a BoxBrushes store,
+    see iter_block_solids. The face materials and UVs are interned once per palette entry.
+    """
+    if not isinstance(blocks, VoxelStore):
+        blocks = VoxelStore.from_records(blocks)
+    faces = [boxes.face_indices(*get_render_state(block_type, properties, mirror_axis))
+             for block_type, properties in blocks.palette.states]
+    materials = numpy.array([face[0] for face in faces], dtype=numpy.uint32).reshape(-1, 6)
+    uvs = numpy.array([face[1] for face in faces], dtype=numpy.uint32).reshape(-1, 6)
+    positions = numpy.column_stack(block_position_arrays(blocks, bounds, mirror_axis))
+    boxes.add_boxes(positions, BLOCK_SIZE, materials[blocks.state], uvs[blocks.state])
+
+def cuboid_box(cuboid, bounds, mirror_axis=None):
+    """
+    Returns the Hammer (x, y, z, size_x, size_y, size_z) of an optimized cuboid, see cuboid_solid.
+    Minecraft y is Hammer z, so a cuboid covers exactly the "raw" blocks it was merged from (see block_positions).
+    """
+    min_x, min_y, min_z, size_x, size_y, size_z = cuboid[:6]
+    bounds_min_x, bounds_min_y, bounds_min_z, bounds_max_x, _, bounds_max_z = bounds
+    if mirror_axis == "x":
+        hammer_x = (bounds_max_x + 1 - min_x - size_x) * BLOCK_SIZE
+        hammer_y = (min_z - bounds_min_z) * BLOCK_SIZE
+    elif mirror_axis == "y":
+        hammer_x = (min_x - bounds_min_x) * BLOCK_SIZE
+        hammer_y = (bounds_max_z + 1 - min_z - size_z) * BLOCK_SIZE
+    else:
+        hammer_x = (min_x - bounds_min_x) * BLOCK_SIZE
+        hammer_y = (min_z - bounds_min_z) * BLOCK_SIZE
+    hammer_z = (min_y - bounds_min_y) * BLOCK_SIZE
+
+    return hammer_x, hammer_y, hammer_z, size_x * BLOCK_SIZE, size_z * BLOCK_SIZE, size_y * BLOCK_SIZE
+
+def cuboid_solid(cuboid, bounds, mirror_axis=None):
+    """
+    Builds the solid of an optimized cuboid - structure: (min_x, min_y, min_z, size_x, size_y, size_z, block_type, properties).
+    Cuboids are placed relative to the minimum of bounds (see get_block_bounds) and mirrored inside them, like "raw" blocks.
+    """
+    # We create a cuboid with dimensions corresponding to the merged object
+    return build_cuboid(*cuboid_box(cuboid, bounds, mirror_axis), *cuboid[6:])
+
+def add_cuboid_boxes(boxes, cuboids, bounds, mirror_axis=None):
+    """
+    Adds optimized cuboids to a BoxBrushes store, see cuboid_solid.
+    """
+    faces = {}  # id(render state) -> face indices
+    for cuboid in cuboids:
+        render_state = get_render_state(cuboid[6], cuboid[7], cuboid=True)
+        face = faces.get(id(render_state))
+        if face is None:
+            face = faces[id(render_state)] = boxes.face_indices(*render_state)
+        boxes.add_box(*cuboid_box(cuboid, bounds, mirror_axis), *face)
 
+def iter_surface_blocks(world_path, x1, z1, x2, z2, dimension='minecraft:overworld', progress=None):
+    """
+    Streaming version of get_surface_blocks - yields the blocks of one chunk at a time,
+    so only a single chunk is held in memory.
+    """
+    if progress is None:
+        progress = ConversionProgress()
+    jobs = get_chunk_jobs(x1, z1, x2, z2)
+    progress.set(chunks_total=len(jobs), chunks_scanned=0, blocks_found=0)
+    log.info(f"Loading world from: {world_path}")
+    world = load_level(world_path)
     try:
-        world.close()
+        for _, found in scan_chunks(world, jobs, dimension, BlockPalette(), {}):
+            progress.add(chunks_scanned=1, blocks_found=len(found))
+            if found:
+                yield found
+        progress.set(chunks_scanned=len(jobs))
+    finally:
+        _close_level(world)
+
+def get_surface_bounds(world_path, x1, z1, x2, z2, dimension='minecraft:overworld', progress=None):
+    """
+    Scans the area chunk by chunk and returns the bounds (see get_block_bounds) of its blocks, or None if it is empty.
+    """
+    bounds = None
+    for blocks in iter_surface_blocks(world_path, x1, z1, x2, z2, dimension, progress):
+        bounds = merge_bounds(bounds, get_block_bounds(blocks))
+    return bounds
+
+def iter_solids(chunks, bounds, mirror_axis=None, optimize=True, cull_hidden=False, remove_caves=False,
+                transparent_blocks=TRANSPARENT_BLOCKS):
+    """
+    Turns an iterable of per-chunk blocks (see iter_surface_blocks) into a stream of solids.
+    Culling and optimization are done per chunk, so blocks on chunk borders are never culled
+    and cuboids do not cross chunk borders.
+    """
+    for blocks in chunks:
+        if cull_hidden or remove_caves:
+            blocks = cull_hidden_blocks(blocks, transparent_blocks, remove_caves)
+        if optimize:
+            for cuboid in optimize_blocks(blocks):
+                yield cuboid_solid(cuboid, bounds, mirror_axis)
+        else:
+            yield from iter_block_solids(blocks, bounds, mirror_axis)
+
+def _counted_solids(solids, progress):
+    for solid in solids:
+        progress.add(brushes_emitted=1, sides=len(solid.side))
+        yield solid
+
+def export_vmf(vmf, output_vmf, progress, solids=(), workers=1, stage="export"):
+    """
+    Writes the VMF (see VMF.export) and counts the bytes written in progress (a ConversionProgress).
+    """
+    progress.start_stage(stage)
+    log.info(f"Saving VMF file to: {output_vmf}")
+
+    def report(done, total):
+        # Throttled by VMF.export, the file size lags behind the written text by at most the file buffer
+        progress.set(bytes_written=os.path.getsize(output_vmf))
+
+    try:
+        vmf.export(output_vmf, solids, workers=workers, progress=report)
     except Exception as e:
-        print(f"Error closing world: {e}")
-
-    return surface_blocks
-
-def adjust_orientation(orientation, mirror_axis):
-    if orientation is None or mirror_axis not in ("x", "y"):
-        return orientation
-    if isinstance(orientation, str):
-        orient = orientation.lower()
-        if mirror_axis == "x":
-            if orient == "east":
-                return "west"
-            elif orient == "west":
-                return "east"
-        elif mirror_axis == "y":
-            if orient == "north":
-                return "south"
-            elif orient == "south":
-                return "north"
-        return orientation
-    if isinstance(orientation, dict):
-        facing = orientation.get("facing", "north").lower()
-        if mirror_axis == "x":
-            if facing == "east":
-                facing = "west"
-            elif facing == "west":
-                facing = "east"
-        elif mirror_axis == "y":
-            if facing == "north":
-                facing = "south"
-            elif facing == "south":
-                facing = "north"
-        rot = orientation.get("rotation", 0)
-        new_rot = (360 - rot) % 360
-        new_orientation = orientation.copy()
-        new_orientation["facing"] = facing
-        new_orientation["rotation"] = new_rot
-        return new_orientation
-    return orientation
-
-def get_and_convert_blocks(world_path, x1, z1, x2, z2, output_vmf, dimension='minecraft:overworld', mirror_axis=None, optimize=False):
+        log.error(f"Error saving VMF file: {e}")
+        raise
+    progress.set(bytes_written=os.path.getsize(output_vmf))
+    log.info(f"Successfully saved VMF file to: {output_vmf}")
+
+def stream_convert_blocks(world_path, x1, z1, x2, z2, output_vmf, dimension='minecraft:overworld', mirror_axis=None, optimize=True,
+                          cull_hidden=False, remove_caves=False, transparent_blocks=TRANSPARENT_BLOCKS, progress=None):
+    """
+    Streaming version of get_and_convert_blocks - chunks yield blocks, blocks yield solids and solids are written
+    straight to the VMF file, so peak memory is bounded by a single chunk instead of the whole area.
+    The area is scanned twice, first only to find the bounds used for positioning and mirroring.
+    """
+    if progress is None:
+        progress = ConversionProgress()
+    progress.start_stage("bounds")
+    bounds = get_surface_bounds(world_path, x1, z1, x2, z2, dimension, progress)
+
+    vmf = VMF()
+    vmf.world = VMFWorld()
+
+    solids = ()
+    if bounds is not None:
+        chunks = iter_surface_blocks(world_path, x1, z1, x2, z2, dimension, progress)
+        solids = iter_solids(chunks, bounds, mirror_axis, optimize, cull_hidden, remove_caves, transparent_blocks)
+        solids = _counted_solids(solids, progress)
+
+    export_vmf(vmf, output_vmf, progress, solids, stage="stream")
+    progress.finish()
+
+def get_and_convert_blocks(world_path, x1, z1, x2, z2, output_vmf, dimension='minecraft:overworld', mirror_axis=None, optimize=True, workers=1,
+                           cull_hidden=False, remove_caves=False, transparent_blocks=TRANSPARENT_BLOCKS, stream=False, progress=None,
+                           report=True):
     """
     Takes all blocks from the selected area and converts them to VMF format.
     If optimize is True, optimization (block merging) will be performed before export.
+    workers sets the number of processes used to scan the chunks, optimize the blocks and write the VMF (1 = serial).
+    If cull_hidden is True, blocks that can never be seen are removed before brushes are created,
+    remove_caves also removes sealed caves, see cull_hidden_blocks.
+    If stream is True, the conversion is done chunk by chunk with bounded memory, see stream_convert_blocks
+    (the chunks are then scanned serially).
+    progress is a MTS_progress.ConversionProgress to subscribe to, a new one is used if it's None. Its stage
+    timings and counters are written next to the VMF as a JSON run report (<name>.report.json) if report is True,
+    and a profile it captures (see ConversionProgress) is saved as <name>.<stage>.prof unless it has a path.
     """
-    surface_blocks = get_surface_blocks(world_path, x1, z1, x2, z2, dimension)
-    
-    if optimize:
-        print("Block optimization...")
-        surface_blocks = optimize_blocks(surface_blocks)
+    if progress is None:
+        progress = ConversionProgress()
+    name = os.path.splitext(output_vmf)[0]
+    if progress.profile is not None and progress.profile_path is None:
+        progress.profile_path = f"{name}.{progress.profile}.prof"
+
+    if stream:
+        stream_convert_blocks(world_path, x1, z1, x2, z2, output_vmf, dimension, mirror_axis, optimize,
+                              cull_hidden, remove_caves, transparent_blocks, progress)
+    else:
+        _convert_blocks(world_path, x1, z1, x2, z2, output_vmf, dimension, mirror_axis, optimize, workers,
+                        cull_hidden, remove_caves, transparent_blocks, progress)
+
+    if report:
+        progress.write_report(f"{name}.report.json", world=world_path, area=[x1, z1, x2, z2], output=output_vmf,
+                              dimension=dimension, mirror_axis=mirror_axis, optimize=optimize, workers=workers,
+                              cull_hidden=cull_hidden, remove_caves=remove_caves, stream=stream)
+
+def _convert_blocks(world_path, x1, z1, x2, z2, output_vmf, dimension, mirror_axis, optimize, workers,
+                    cull_hidden, remove_caves, transparent_blocks, progress):
+    surface_blocks = get_surface_blocks(world_path, x1, z1, x2, z2, dimension, workers, progress)
+    progress.set(unique_states=len(surface_blocks.palette))
+
+    if cull_hidden or remove_caves:
+        progress.start_stage("cull")
+        surface_blocks = cull_hidden_blocks(surface_blocks, transparent_blocks, remove_caves)
     
     vmf = VMF()
     vmf.world = VMFWorld()
 
     if surface_blocks:
+        progress.start_stage("texture")  # Fills the render table used by the brushes
+        for block_type, properties in surface_blocks.palette.states:
+            get_render_state(block_type, properties, None if optimize else mirror_axis, cuboid=optimize)
+
+        bounds = get_block_bounds(surface_blocks)
         if not optimize:
             # For "raw" blocks - structure: (x, y, z, block_type, properties)
-            min_x = min(x for x, _, _, _, _ in surface_blocks)
-            min_y = min(y for _, y, _, _, _ in surface_blocks)
-            min_z = min(z for _, _, z, _, _ in surface_blocks)
-            max_x = max(x for x, _, _, _, _ in surface_blocks)
-            max_z = max(z for _, _, z, _, _ in surface_blocks)
-            
-            for x, y, z, block_type, properties in surface_blocks:
-                if mirror_axis == "x":
-                    hammer_x = (max_x - x) * BLOCK_SIZE
-                    hammer_y = (z - min_z) * BLOCK_SIZE
-                elif mirror_axis == "y":
-                    hammer_x = (x - min_x) * BLOCK_SIZE
-                    hammer_y = (max_z - z) * BLOCK_SIZE
-                else:
-                    hammer_x = (x - min_x) * BLOCK_SIZE
-                    hammer_y = (z - min_z) * BLOCK_SIZE
-                hammer_z = (y - min_y) * BLOCK_SIZE
-            
-                texture_config, orientation = compute_texture_config(block_type, properties)
-                orientation = adjust_orientation(orientation, mirror_axis)
-                create_block(vmf, hammer_x, hammer_y, hammer_z, block_type, texture_config, orientation)
+            progress.start_stage("build")
+            add_block_boxes(vmf.world.boxes, surface_blocks, bounds, mirror_axis)
         else:
             # For optimized cuboids - structure: (min_x, min_y, min_z, size_x, size_y, size_z, block_type, properties)
-            # To correctly calculate mirror_axis, we determine the global max (on x or z axis) within the optimized data.
-            global_max_x = max(min_x + size_x for min_x, _, _, size_x, _, _, _, _ in surface_blocks)
-            global_max_z = max(min_z + size_z for _, _, min_z, _, _, size_z, _, _ in surface_blocks)
-            
-            for min_x, min_y, min_z, size_x, size_y, size_z, block_type, properties in surface_blocks:
-                if mirror_axis == "x":
-                    hammer_x = (global_max_x - min_x - size_x) * BLOCK_SIZE
-                    hammer_y = (min_z) * BLOCK_SIZE
-                elif mirror_axis == "y":
-                    hammer_x = (min_x) * BLOCK_SIZE
-                    hammer_y = (global_max_z - min_z - size_z) * BLOCK_SIZE
-                else:
-                    hammer_x = (min_x) * BLOCK_SIZE
-                    hammer_y = (min_z) * BLOCK_SIZE
-                hammer_z = (min_y) * BLOCK_SIZE
-                
-                # We create a cuboid with dimensions corresponding to the merged object
-                create_cuboid(vmf, hammer_x, hammer_y, hammer_z, size_x * BLOCK_SIZE, size_y * BLOCK_SIZE, size_z * BLOCK_SIZE, block_type, properties)
-            
-    print(f"Saving VMF file to: {output_vmf}")
-    try:
-        vmf.export(output_vmf)
-        print(f"Successfully saved VMF file to: {output_vmf}")
-    except Exception as e:
-        print(f"Error saving VMF file: {e}")
-        raise
+            progress.start_stage("optimize")
+            cuboids = optimize_blocks(surface_blocks, workers=workers)
+            progress.set(cuboids=len(cuboids))
+            progress.start_stage("build")
+            add_cuboid_boxes(vmf.world.boxes, cuboids, bounds, mirror_axis)
+        progress.set(brushes_emitted=len(vmf.world.boxes), sides=6 * len(vmf.world.boxes))
+
+    export_vmf(vmf, output_vmf, progress, workers=workers)
+    progress.finish()
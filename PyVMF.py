@@ -1,16 +1,28 @@
 from __future__ import annotations
 import re
 from copy import deepcopy
+import os
 import sys
 import time
 import math
+import shutil
 import operator
+import heapq
+import itertools
+import logging
+import tempfile
+import multiprocessing
+import numpy
+from concurrent.futures import ProcessPoolExecutor
 from random import randint
 from tools import num
 from importer import *
-from typing import List, Tuple, Generator
+from typing import List, Tuple, Generator, Iterable
+from types import MappingProxyType
 import warnings
 
+log = logging.getLogger(__name__)
+
 
 class Convert:
     """
@@ -53,6 +65,8 @@ class Common:
     The parent class to all VMF classes that need to be exported to the .VMF file.
     """
 
+    __slots__ = ()
+
     ID = 0
 
     def export(self):
@@ -103,6 +117,34 @@ class Common:
         return dic
 
 
+class _Shared:
+    """
+    Mixin for immutable instances shared between many objects (flyweights), to change one, replace it on its owner
+    with a :func:`copy` first. Copying or deep copying the owner keeps sharing the instance.
+    """
+
+    __slots__ = ()
+
+    shared = True
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"This {type(self).__mro__[2].__name__} is shared between several objects and can't be "
+                             f"changed, replace it with a copy() first")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @classmethod
+    def _create(cls, **values):
+        instance = object.__new__(cls)
+        for name, value in values.items():
+            object.__setattr__(instance, name, value)
+        return instance
+
+
 class Color:
     """
     Simple RGB color class
@@ -148,10 +190,19 @@ class Color:
         """
         self.set(randint(0, 255), randint(0, 255), randint(0, 255))
 
+    shared = False
+
+    def copy(self) -> Color:
+        return Color(self.r, self.g, self.b)
+
     def export(self) -> Tuple[int, int, int]:
         return self.r, self.g, self.b
 
 
+class _SharedColor(_Shared, Color):
+    pass
+
+
 class ColorLight(Color):
     """
     Simple RGB color class with brightness (used for lights)
@@ -266,7 +317,6 @@ class World(Common):
     NAME = "world"
 
     def __init__(self, dic: dict = None, children: list = None):
-        print(" INIT A NEW WORLD ")
         dic, children = self._dic_and_children(dic, children)
 
         self.id = dic.pop("id", self.ids())
@@ -282,29 +332,44 @@ class World(Common):
                             "skyname"]
 
         self.solids = []
+        self.boxes = BoxBrushes()  # Box solids kept in arrays, exported after the solids, see get_solids
+        self.lazy = None  # Solids left in the file of a lazily loaded VMF, see load_vmf
         self.hidden = []
         self.group = []
-        counter = 0
         for child in children:
             if str(child) == Solid.NAME:
-                counter = counter +1
-                print("Appending solid child: " + str(child) + ": " + str(counter))
-                if counter == 2045:
-                    print("breakpoint me")
                 self.solids.append(Solid(child.dic, child.children))
 
             elif str(child) == Hidden.NAME:
-                print("Appending hidden child")
                 self.hidden.append(Hidden(child.dic, child.children))
 
             elif str(child) == Group.NAME:
-                print("Appending group child")
                 self.group.append(Group(child.dic, child.children))
-                
-        print("done")
+
+        if children:
+            log.debug("World loaded: %d solids, %d hidden, %d groups", len(self.solids), len(self.hidden),
+                      len(self.group))
+
+    def materialize_boxes(self):
+        """
+        Turns the boxes into :class:`Solid` instances appended to the solids, the export order stays the same
+        """
+        if self.boxes:
+            self.solids.extend(self.boxes.to_solids())
+            self.boxes.clear()
+
+    def load_lazy_solids(self):
+        """
+        Parses the solids still in the file of a lazily loaded VMF (see :func:`load_vmf`), they're put before the other
+        solids in the order of the file
+        """
+        if self.lazy is not None:
+            self.solids[:0] = self.lazy.load_all()
+            self.lazy.close()
+            self.lazy = None
 
     def export_children(self):
-        return (*self.solids, *self.hidden, *self.group)
+        return (*self.solids, self.boxes, *self.hidden, *self.group)
 
 
 class Vertex(Common):  # Vertex has to be above the Solid class (see: set_pos_vertex function)
@@ -319,12 +384,13 @@ class Vertex(Common):  # Vertex has to be above the Solid class (see: set_pos_ve
     :type z: :obj:`int` or :obj:`float`
     """
 
+    __slots__ = ("x", "y", "z", "normal")
+
     def __init__(self, x=0, y=0, z=0):
         self.x = x
         self.y = y
         self.z = z
 
-        self.sorting = 0  # Used in solid get_3d_extremity
         self.normal = 0  # Vertices are represented differently in the VMF depending on the class
 
     def __str__(self):
@@ -498,6 +564,60 @@ class Vertex(Common):  # Vertex has to be above the Solid class (see: set_pos_ve
                 self.z)
 
 
+class VertexWelder:
+    """
+    Links vertices closer than a distance on every axis (see :func:`~Vertex.similar`) to a single :class:`Vertex`
+    instance. The vertices seen so far are kept in a spatial hash with cells twice as wide as that distance, so a
+    vertex is only compared with the vertices of its cell and of the 7 cells next to the corner it's closest to.
+
+    One welder can be used for many solids through :func:`~Solid.link_vertices`, the similar vertices of different
+    solids are then moved to the same position without being shared.
+
+    :param similar: Distance between vertices to be linked (in Hammer units), 0 only links equal vertices
+    :type similar: :obj:`int` or :obj:`float`
+    """
+
+    def __init__(self, similar=0.0):
+        self.similar = similar
+        self.cells = {}  # Cell -> vertices in it
+        self.positions = {}  # Position -> vertex, equal vertices are found without going through the cells
+
+    def weld(self, vertex: Vertex) -> Vertex:
+        """
+        :param vertex: The vertex to link
+        :type vertex: :class:`Vertex`
+        :return: The first vertex seen that is similar to the given one, or the vertex itself if there's none
+        :rtype: :class:`Vertex`
+        """
+        position = (vertex.x, vertex.y, vertex.z)
+        other = self.positions.get(position)
+        if other is not None:
+            return other
+        self.positions[position] = vertex
+        similar = self.similar
+        if not similar:
+            return vertex
+
+        # Similar vertices are at most in the next cell, on the side of the closest cell edge on each axis
+        size = 2 * similar
+        x, y, z = vertex.x / size, vertex.y / size, vertex.z / size
+        cx, cy, cz = math.floor(x), math.floor(y), math.floor(z)
+        xs = (cx, cx - 1 if x - cx < 0.5 else cx + 1)
+        ys = (cy, cy - 1 if y - cy < 0.5 else cy + 1)
+        zs = (cz, cz - 1 if z - cz < 0.5 else cz + 1)
+        cells = self.cells
+        for a in xs:
+            for b in ys:
+                for c in zs:
+                    for other in cells.get((a, b, c), ()):
+                        if vertex.similar(other, similar):
+                            self.positions[position] = other
+                            return other
+
+        cells.setdefault((cx, cy, cz), []).append(vertex)
+        return vertex
+
+
 class Solid(Common):
     """
     Corresponds to an individual solid just like in Hammer
@@ -510,13 +630,16 @@ class Solid(Common):
 
     NAME = "solid"
 
+    __slots__ = ("id", "other", "side", "editor")
+
+    export_list = ["id"]
+
     def __init__(self, dic: dict = None, children: list = None):
         dic, children = self._dic_and_children(dic, children)
 
         self.id = dic.pop("id", self.ids())
 
         self.other = dic
-        self.export_list = ["id"]
 
         self.side = []
         self.editor = None
@@ -527,6 +650,27 @@ class Solid(Common):
             elif str(child) == Editor.NAME:
                 self.editor = Editor(child.dic)
 
+    @classmethod
+    def from_sides(cls, sides: Iterable[Side], editor: Editor = None, solid_id: int = None) -> Solid:
+        """
+        Creates a solid straight from already built sides, see :func:`~Side.from_plane`
+
+        :param sides: The sides of the solid
+        :type sides: :obj:`list` of :class:`Side`
+        :param editor: The editor settings of the solid
+        :type editor: :class:`Editor`
+        :param solid_id: The id of the solid, a new one is used if not given
+        :type solid_id: :obj:`int`
+        :return: A new solid
+        :rtype: :class:`Solid`
+        """
+        solid = cls.__new__(cls)
+        solid.id = solid_id if solid_id is not None else solid.ids()
+        solid.other = {}
+        solid.side = list(sides)
+        solid.editor = editor
+        return solid
+
     def add_sides(self, *args: Side):
         """
         Adds sides to the solid, note that no checks are made for validity
@@ -547,9 +691,12 @@ class Solid(Common):
         :param z:
         :type z: :obj:`int` or :obj:`float`
         """
-        for side in self.side:
-            for vert in side.plane:
-                vert.move(x, y, z)
+        for vert in self._vertices():
+            vert.move(x, y, z)
+
+    def _vertices(self):
+        # Every Vertex instance once, the vertices linked by link_vertices are shared between sides
+        return {id(vert): vert for side in self.side for vert in side.plane}.values()
 
     def get_linked_vertices(self, vertex: Vertex, similar=0.0) -> List[Vertex, ...]:
         """
@@ -582,8 +729,8 @@ class Solid(Common):
         :param angle: How much to rotate in degrees
         :type angle: :obj:`int` or :obj:`float`
         """
-        for side in self.side:
-            side.rotate_x(center, angle)
+        for vert in self._vertices():
+            vert.rotate_x(center, angle)
 
     def rotate_y(self, center: Vertex, angle):
         """
@@ -594,8 +741,8 @@ class Solid(Common):
         :param angle: How much to rotate in degrees
         :type angle: :obj:`int` or :obj:`float`
         """
-        for side in self.side:
-            side.rotate_y(center, angle)
+        for vert in self._vertices():
+            vert.rotate_y(center, angle)
 
     def rotate_z(self, center: Vertex, angle):
         """
@@ -606,11 +753,11 @@ class Solid(Common):
         :param angle: How much to rotate in degrees
         :type angle: :obj:`int` or :obj:`float`
         """
-        for side in self.side:
-            side.rotate_z(center, angle)
+        for vert in self._vertices():
+            vert.rotate_z(center, angle)
 
     def flip(self, x=None, y=None, z=None):
-        for vert in self.get_all_vertices():
+        for vert in self._vertices():
             vert.flip(x, y, z)
 
     def scale(self, center: Vertex, x=1.0, y=1.0, z=1.0):
@@ -630,11 +777,21 @@ class Solid(Common):
         x -= 1
         y -= 1
         z -= 1
-        for vertex in self.get_all_vertices():
+        for vertex in self._vertices():
             diff = vertex.diff(center)
             fixed_diff = (diff.x * x, diff.y * y, diff.z * z)
             vertex.move(*fixed_diff)
 
+    def transform(self, matrix: numpy.ndarray):
+        """
+        Transforms the solid with a 4x4 affine matrix, see :class:`Transform` to make one and to transform many solids
+        at once
+
+        :param matrix: The matrix
+        :type matrix: :obj:`numpy.ndarray`
+        """
+        Transform.apply((self,), matrix)
+
     @property
     def center(self) -> Vertex:
         """
@@ -730,30 +887,32 @@ class Solid(Common):
         """
         verts = self.get_only_unique_vertices()
 
-        for vert in verts:
-            vert.sorting = 0
+        def sorting(vert):
+            value = 0
             if x is not None:
                 if x:
-                    vert.sorting += vert.x
+                    value += vert.x
                 else:
-                    vert.sorting -= vert.x
+                    value -= vert.x
             if y is not None:
                 if y:
-                    vert.sorting += vert.y
+                    value += vert.y
                 else:
-                    vert.sorting -= vert.y
+                    value -= vert.y
             if z is not None:
                 if z:
-                    vert.sorting += vert.z
+                    value += vert.z
                 else:
-                    vert.sorting -= vert.z
+                    value -= vert.z
+            return value
 
-        sort = sorted(verts, key=operator.attrgetter("sorting"))
+        sort = sorted(verts, key=sorting)
         best = sort[-1]
+        best_value = sorting(best)
 
         ties = []
         for vert in sort:
-            if vert.sorting == best.sorting:
+            if sorting(vert) == best_value:
                 ties.append(vert)
 
         return best, ties
@@ -761,15 +920,13 @@ class Solid(Common):
     def get_all_vertices(self) -> List[Vertex, ...]:
         """
         Finds all vertices on the solid, including overlapping ones from the different sides, for only unique vertices
-        use :func:`~Solid.get_only_unique_vertices`
+        use :func:`~Solid.get_only_unique_vertices`. A vertex linked by :func:`~Solid.link_vertices` is a single instance
+        shared by sides, it's only listed once.
 
         :return: All the vertices on the solid
         :rtype: :obj:`list` of :class:`Vertex`
         """
-        vertex_list = []
-        for side in self.side:
-            vertex_list.extend(side.plane)
-        return vertex_list
+        return list(self._vertices())
 
     def get_sides(self) -> List[Side, ...]:
         """
@@ -794,6 +951,17 @@ class Solid(Common):
 
         return Vertex(max(x) - min(x), max(y) - min(y), max(z) - min(z))
 
+    def get_bounds(self) -> Tuple[Vertex, Vertex]:
+        """
+        :return: The lowest and highest corners of the bounding box around the solid
+        :rtype: :obj:`tuple` of :class:`Vertex`
+        """
+        vertices = self.get_all_vertices()
+        x = [vert.x for vert in vertices]
+        y = [vert.y for vert in vertices]
+        z = [vert.z for vert in vertices]
+        return Vertex(min(x), min(y), min(z)), Vertex(max(x), max(y), max(z))
+
     def get_displacement_sides(self) -> List[Side]:
         """
         Gets the sides that have displacements, use :func:`~Solid.get_displacement_matrix_sides` to get the matrices
@@ -986,21 +1154,36 @@ class Solid(Common):
         """
         return len(self.side) <= 6
 
-    def link_vertices(self, similar=0.0):
+    def link_vertices(self, similar=0.0, welder: VertexWelder = None):
         """
-        Tries to link all the vertices that are similiar
+        Links all the vertices that are similar, they become a single :class:`Vertex` instance shared by the sides
 
-        :param similar:
+        :param similar: Distance between vertices to be linked (in Hammer units), 0 only links equal vertices
+        :type similar: :obj:`int` or :obj:`float`
+        :param welder: Also welds the vertices with the ones of the other solids given to this welder, the similar
+            distance of the welder is used, see :func:`~VMF.link_vertices`. The vertices are moved to the position of
+            the similar vertex of the other solid, but instances are only shared inside the solid, so that moving
+            each solid of a group never moves a vertex twice.
+        :type welder: :class:`VertexWelder`
         """
-        vertex_list = []
+        if welder is None:
+            weld = VertexWelder(similar).weld
+            for side in self.side:
+                side.plane = [weld(vertex) for vertex in side.plane]
+            return
 
-        for side in self.get_sides():
-            for i, vertex in enumerate(side.get_vertices()):
-                for vertex_check in vertex_list:
-                    if vertex.similar(vertex_check, similar):
-                        side.plane[i] = vertex_check
-                    else:
-                        vertex_list.append(vertex)
+        # The welder gets copies, they never move, and each copy it returns stands for one vertex of this solid
+        linked = {}  # id(welded copy) -> vertex of the solid
+        for side in self.side:
+            plane = []
+            for vertex in side.plane:
+                welded = welder.weld(Vertex(vertex.x, vertex.y, vertex.z))
+                vert = linked.get(id(welded))
+                if vert is None:
+                    vert = linked[id(welded)] = vertex
+                    vertex.x, vertex.y, vertex.z = welded.x, welded.y, welded.z
+                plane.append(vert)
+            side.plane = plane
 
     def set_texture(self, new_material: str):
         """
@@ -1026,6 +1209,14 @@ class Solid(Common):
 class Editor(Common):
     NAME = "editor"
 
+    __slots__ = ("parent_type", "color", "groupid", "visgroupid", "visgroupshown", "visgroupautoshown", "logicalpos",
+                 "other")
+
+    export_list = []
+
+    shared = False
+    _default = None
+
     def __init__(self, dic: dict = None, parent_type=None):
         dic = self._dic(dic)
 
@@ -1040,7 +1231,33 @@ class Editor(Common):
         self.logicalpos = dic.pop("logicalpos", "[0 2500]")  # Unique to Entity
 
         self.other = dic
-        self.export_list = []
+
+    @classmethod
+    def default(cls) -> Editor:
+        """
+        The default editor settings, as one immutable instance shared by all the solids using it
+
+        :return: The shared default editor
+        :rtype: :class:`Editor`
+        """
+        if Editor._default is None:
+            editor = Editor()
+            Editor._default = _SharedEditor._create(
+                parent_type=editor.parent_type, color=_SharedColor._create(**vars(editor.color)),
+                groupid=editor.groupid, visgroupid=editor.visgroupid, visgroupshown=editor.visgroupshown,
+                visgroupautoshown=editor.visgroupautoshown, logicalpos=editor.logicalpos,
+                other=MappingProxyType({}))
+        return Editor._default
+
+    def copy(self) -> Editor:
+        editor = Editor(dict(self.other), self.parent_type)
+        editor.color = self.color.copy()
+        editor.groupid = self.groupid
+        editor.visgroupid = self.visgroupid
+        editor.visgroupshown = self.visgroupshown
+        editor.visgroupautoshown = self.visgroupautoshown
+        editor.logicalpos = self.logicalpos
+        return editor
 
     def has_visgroup(self) -> bool:
         if self.visgroupid is None:
@@ -1062,6 +1279,13 @@ class Editor(Common):
         return d, self.other
 
 
+class _SharedEditor(_Shared, Editor):
+    __slots__ = ()
+
+    def __reduce__(self):
+        return Editor.default, ()
+
+
 class Group(Common):
     NAME = "group"
 
@@ -1096,6 +1320,11 @@ class Side(Common):
 
     NAME = "side"
 
+    __slots__ = ("id", "plane", "material", "uaxis", "vaxis", "rotation", "lightmapscale", "smoothing_groups", "other",
+                 "dispinfo")
+
+    export_list = []
+
     def __init__(self, dic: dict = None, children: list = None):
         dic, children = self._dic_and_children(dic, children)
 
@@ -1116,13 +1345,44 @@ class Side(Common):
         self.smoothing_groups = dic.pop("smoothing_groups", 0)
 
         self.other = dic
-        self.export_list = []
 
         self.dispinfo = None
         for child in children:
             if str(child) == DispInfo.NAME:
                 self.dispinfo = DispInfo(child.dic, child.children, self)
 
+    @classmethod
+    def from_plane(cls, plane, material: str = "TOOLS/TOOLSNODRAW", uaxis: UVaxis = None,
+                   vaxis: UVaxis = None, side_id: int = None) -> Side:
+        """
+        Creates a side straight from numeric values, skipping the string parsing done when loading a VMF
+
+        :param plane: The 3 vertices defining the plane
+        :type plane: :obj:`list` of :class:`Vertex` or of (x, y, z) :obj:`tuple`
+        :param material: The texture to use
+        :type material: :obj:`str`
+        :param uaxis: The u axis of the texture, defaults to a shared [1 0 0 0] 0.1562, see :func:`~UVaxis.shared_instance`
+        :type uaxis: :class:`UVaxis`
+        :param vaxis: The v axis of the texture, defaults to a shared [0 -1 0 0] 0.1562
+        :type vaxis: :class:`UVaxis`
+        :param side_id: The id of the side, a new one is used if not given
+        :type side_id: :obj:`int`
+        :return: A new side
+        :rtype: :class:`Side`
+        """
+        side = cls.__new__(cls)
+        side.id = side_id if side_id is not None else side.ids()
+        side.plane = [v if isinstance(v, Vertex) else Vertex(*v) for v in plane]
+        side.material = material
+        side.uaxis = uaxis if uaxis is not None else UVaxis.shared_instance(1, 0, 0, 0, 0.1562)
+        side.vaxis = vaxis if vaxis is not None else UVaxis.shared_instance(0, -1, 0, 0, 0.1562)
+        side.rotation = 0
+        side.lightmapscale = 16
+        side.smoothing_groups = 0
+        side.other = {}
+        side.dispinfo = None
+        return side
+
     def __str__(self):
         return f"({self.plane[0]}) ({self.plane[1]}) ({self.plane[2]})"
 
@@ -1475,7 +1735,6 @@ class Matrix(Common):
         :rtype: :obj:`int`, :obj:`int`, :obj:`list` of :obj:`str`
         """
         for y in range(self.size - triangle):
-            print("dic is : " +str(dic))
             if len(dic) > 0:
                 t = dic.pop(f"row{y}").split(" ")
                 for x in range((self.size - triangle) * a_var):
@@ -1652,6 +1911,11 @@ class AllowedVerts(Common):
 
 
 class UVaxis(Common):
+    __slots__ = ("x", "y", "z", "offset", "scale")
+
+    shared = False
+    _shared_instances = {}
+
     def __init__(self, x, y, z, offset, scale):
         self.x = x
         self.y = y
@@ -1659,6 +1923,24 @@ class UVaxis(Common):
         self.offset = offset
         self.scale = scale
 
+    @classmethod
+    def shared_instance(cls, x, y, z, offset, scale) -> UVaxis:
+        """
+        Gets an immutable UV axis shared by all the sides using the same values
+
+        :return: The shared UV axis
+        :rtype: :class:`UVaxis`
+        """
+        key = (x, y, z, offset, scale)
+        axis = UVaxis._shared_instances.get(key)
+        if axis is None:
+            axis = _SharedUVaxis._create(x=x, y=y, z=z, offset=offset, scale=scale)
+            UVaxis._shared_instances[key] = axis
+        return axis
+
+    def copy(self) -> UVaxis:
+        return UVaxis(self.x, self.y, self.z, self.offset, self.scale)
+
     def __str__(self):
         return f"[{self.x} {self.y} {self.z} {self.offset}] {self.scale}"
 
@@ -1673,6 +1955,13 @@ class UVaxis(Common):
                 self.scale)
 
 
+class _SharedUVaxis(_Shared, UVaxis):
+    __slots__ = ()
+
+    def __reduce__(self):
+        return UVaxis.shared_instance, self.export()
+
+
 class Vector(Common):
     def __init__(self, x, y, z):
         self.x = x
@@ -2003,6 +2292,773 @@ class Box(Common):
         self.export_list = ["mins", "maxs"]
 
 
+class BoxBrushes:
+    """
+    Compact store of axis-aligned box solids, an alternative to keeping one :class:`Solid` object graph per brush.
+    Boxes are held in NumPy arrays: N x 6 integer extents (min x, y, z then max x, y, z), the solid ids, and per face
+    indices into the interned material and UV tables. The faces are in :func:`~SolidGenerator.cube` order and the ids
+    are reserved the same way (6 side ids, then the solid id), so a box exports exactly like the equivalent cube.
+
+    Boxes are written straight to VMF text, :class:`Solid` instances are only built by :func:`to_solids`.
+    """
+
+    NAME = "solid"
+
+    DEFAULT_MATERIAL = "TOOLS/TOOLSNODRAW"
+    DEFAULT_UAXIS = "[1 0 0 0] 0.1562"
+    DEFAULT_VAXIS = "[0 -1 0 0] 0.1562"
+
+    # Solids formatted per written chunk of text
+    EXPORT_CHUNK = 1024
+
+    def __init__(self):
+        self.clear()
+
+        self.material_table = []  # Material names, indexed by the face material indices
+        self.uv_table = []  # (uaxis, vaxis) pairs, indexed by the face UV indices
+        self._material_index = {}
+        self._uv_index = {}
+
+    def __len__(self):
+        return len(self._ids) + sum(len(part[1]) for part in self._parts) + len(self._pending[0])
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return iter(self.to_solids())
+
+    def intern_material(self, material: str = None) -> int:
+        """
+        Gets the index of a material in the material table, adding it if it's new
+
+        :param material: The material, None for the default one (TOOLS/TOOLSNODRAW)
+        :type material: :obj:`str`
+        :return: The material index
+        :rtype: :obj:`int`
+        """
+        if material is None:
+            material = BoxBrushes.DEFAULT_MATERIAL
+        index = self._material_index.get(material)
+        if index is None:
+            index = len(self.material_table)
+            self._material_index[material] = index
+            self.material_table.append(material)
+        return index
+
+    def intern_uv(self, uaxis=None, vaxis=None) -> int:
+        """
+        Gets the index of a texture axis pair in the UV table, adding it if it's new
+
+        :param uaxis: The u axis, as a :class:`UVaxis` or its VMF string, None for the default [1 0 0 0] 0.1562
+        :param vaxis: The v axis, None for the default [0 -1 0 0] 0.1562
+        :return: The UV index
+        :rtype: :obj:`int`
+        """
+        key = (str(uaxis) if uaxis is not None else BoxBrushes.DEFAULT_UAXIS,
+               str(vaxis) if vaxis is not None else BoxBrushes.DEFAULT_VAXIS)
+        index = self._uv_index.get(key)
+        if index is None:
+            index = len(self.uv_table)
+            self._uv_index[key] = index
+            self.uv_table.append(key)
+        return index
+
+    def face_indices(self, materials: Iterable[str], uaxes: Iterable = None, vaxes: Iterable = None):
+        """
+        Interns the materials and texture axes of the 6 faces of a box
+
+        :param materials: The 6 face materials, None entries keep the default material
+        :param uaxes: The 6 face u axes, the default ones if not given
+        :param vaxes: The 6 face v axes, the default ones if not given
+        :return: The material indices and the UV indices of the faces
+        :rtype: :obj:`tuple` of :obj:`int`, :obj:`tuple` of :obj:`int`
+        """
+        if uaxes is None:
+            uaxes = (None,) * 6
+        if vaxes is None:
+            vaxes = (None,) * 6
+        return (tuple(self.intern_material(material) for material in materials),
+                tuple(self.intern_uv(uaxis, vaxis) for uaxis, vaxis in zip(uaxes, vaxes)))
+
+    def add_box(self, x, y, z, w, h, l, materials: Tuple[int, ...], uvs: Tuple[int, ...]) -> int:
+        """
+        Adds a single box, just like :func:`~SolidGenerator.cube` the box spans from (x, y, z) to (x + w, y + h, z + l)
+
+        :param materials: The 6 face material indices, see :func:`face_indices`
+        :param uvs: The 6 face UV indices
+        :return: The id of the box solid
+        :rtype: :obj:`int`
+        """
+        Common.ID += 7
+        extents, material_rows, uv_rows = self._pending
+        extents.append((x, y, z, x + w, y + h, z + l, Common.ID))
+        material_rows.append(materials)
+        uv_rows.append(uvs)
+        return Common.ID
+
+    def add_boxes(self, mins, sizes, materials, uvs):
+        """
+        Adds many boxes at once from arrays
+
+        :param mins: N x 3 minimum corners
+        :param sizes: N x 3 box sizes, or a single size for all the boxes
+        :param materials: N x 6 face material indices, see :func:`intern_material`
+        :param uvs: N x 6 face UV indices, see :func:`intern_uv`
+        """
+        mins = numpy.asarray(mins, dtype=numpy.int64).reshape(-1, 3)
+        count = len(mins)
+        if not count:
+            return
+        self._flush_pending()
+        ids = Common.ID + 7 * numpy.arange(1, count + 1, dtype=numpy.int64)
+        Common.ID += 7 * count
+        extents = numpy.hstack((mins, mins + numpy.broadcast_to(numpy.asarray(sizes, dtype=numpy.int64), mins.shape)))
+        self._parts.append((extents, ids,
+                            numpy.asarray(materials, dtype=numpy.uint32).reshape(count, 6),
+                            numpy.asarray(uvs, dtype=numpy.uint32).reshape(count, 6)))
+
+    def _flush_pending(self):
+        extents, material_rows, uv_rows = self._pending
+        if extents:
+            rows = numpy.array(extents, dtype=numpy.int64)
+            self._parts.append((rows[:, :6], rows[:, 6], numpy.array(material_rows, dtype=numpy.uint32),
+                                numpy.array(uv_rows, dtype=numpy.uint32)))
+            self._pending = ([], [], [])
+
+    def _consolidate(self):
+        self._flush_pending()
+        if self._parts:
+            parts = [(self._extents, self._ids, self._materials, self._uvs)] + self._parts
+            self._parts = []
+            self._extents, self._ids, self._materials, self._uvs = (numpy.concatenate(column) for column in zip(*parts))
+
+    @property
+    def extents(self):
+        self._consolidate()
+        return self._extents
+
+    @property
+    def ids(self):
+        self._consolidate()
+        return self._ids
+
+    @property
+    def materials(self):
+        self._consolidate()
+        return self._materials
+
+    @property
+    def uvs(self):
+        self._consolidate()
+        return self._uvs
+
+    def clear(self):
+        """
+        Removes all the boxes, the material and UV tables are kept
+        """
+        self._extents = numpy.zeros((0, 6), dtype=numpy.int64)
+        self._ids = numpy.zeros(0, dtype=numpy.int64)  # Solid ids, the side ids are the 6 before
+        self._materials = numpy.zeros((0, 6), dtype=numpy.uint32)
+        self._uvs = numpy.zeros((0, 6), dtype=numpy.uint32)
+        self._parts = []  # Appended arrays not yet joined, see _consolidate
+        self._pending = ([], [], [])  # Boxes added one by one, (extents + id, materials, uvs) rows
+
+    def slice(self, start: int, end: int) -> BoxBrushes:
+        """
+        Gets the boxes from start to end as a new store sharing the material and UV tables
+
+        :return: The boxes in the range
+        :rtype: :class:`BoxBrushes`
+        """
+        boxes = BoxBrushes()
+        boxes.material_table, boxes.uv_table = self.material_table, self.uv_table
+        boxes._material_index, boxes._uv_index = self._material_index, self._uv_index
+        boxes._extents = self.extents[start:end]
+        boxes._ids = self.ids[start:end]
+        boxes._materials = self.materials[start:end]
+        boxes._uvs = self.uvs[start:end]
+        return boxes
+
+    def nbytes(self) -> int:
+        """
+        Memory used by the box arrays in bytes (the material and UV tables are not included)
+        """
+        return self.extents.nbytes + self.ids.nbytes + self.materials.nbytes + self.uvs.nbytes
+
+    @staticmethod
+    def _planes(x, y, z, x2, y2, z2):
+        return (((x2, y, z2), (x2, y, z), (x, y, z)),
+                ((x2, y2, z), (x2, y2, z2), (x, y2, z2)),
+                ((x, y, z), (x, y2, z), (x, y2, z2)),
+                ((x2, y2, z), (x2, y, z), (x2, y, z2)),
+                ((x, y, z2), (x, y2, z2), (x2, y2, z2)),
+                ((x, y2, z), (x, y, z), (x2, y, z)))
+
+    def to_solids(self) -> List[Solid, ...]:
+        """
+        Builds a :class:`Solid` for every box, keeping the box ids
+
+        :return: The solids, in the order the boxes were added
+        :rtype: :obj:`list` of :class:`Solid`
+        """
+        editor = Editor.default()
+        # Well formed axes are parsed like in a loaded VMF, others are kept as the strings they were given as
+        uv_axes = [tuple(Convert.string_to_uvaxis(axis) if axis.count(" ") == 4 else axis for axis in pair)
+                   for pair in self.uv_table]
+        solids = []
+        for extents, solid_id, materials, uvs in zip(self.extents.tolist(), self.ids.tolist(),
+                                                     self.materials.tolist(), self.uvs.tolist()):
+            sides = []
+            for i, plane in enumerate(self._planes(*extents)):
+                uaxis, vaxis = uv_axes[uvs[i]]
+                sides.append(Side.from_plane(plane, self.material_table[materials[i]], uaxis, vaxis,
+                                             side_id=solid_id - 6 + i))
+            solids.append(Solid.from_sides(sides, editor, solid_id=solid_id))
+        return solids
+
+    def export_text(self, indent: int = 1) -> Generator[str, ...]:
+        """
+        Formats the boxes as VMF solid categories
+
+        :param indent: The indent of the solid category names, 1 for solids of the world
+        :type indent: :obj:`int`
+        :return: Chunks of VMF text, each one holding up to :attr:`EXPORT_CHUNK` solids
+        :rtype: :obj:`generator` of :obj:`str`
+        """
+        t = "\t" * indent
+        t1 = t + "\t"
+        t2 = t1 + "\t"
+        editor_dic, editor_other = Editor.default().export()
+        editor = "".join(f"{t2}\"{key}\" \"{value}\"\n" for dic in (editor_dic, editor_other)
+                         for key, value in dic.items())
+
+        # One %-format template per solid. Its fields are taken from the columns of the rows built below (solid id,
+        # side ids, x, y, z, x2, y2, z2 and the pre-formatted texture lines of the faces) in the order of field_columns
+        def escape(text):
+            return text.replace("%", "%%")
+
+        template = escape(f"{t}solid\n{t}{{\n{t1}\"id\" \"") + "%s" + escape("\"\n")
+        field_columns = [0]
+        for i, plane in enumerate(self._planes(7, 8, 9, 10, 11, 12)):
+            template += (escape(f"{t1}side\n{t1}{{\n{t2}\"id\" \"") + "%s" + escape(f"\"\n{t2}\"plane\" \"")
+                         + " ".join(["(%s %s %s)"] * 3) + escape("\"\n") + "%s" + escape(f"{t1}}}\n"))
+            field_columns += [1 + i, *(column for vertex in plane for column in vertex), 13 + i]
+        template += escape(f"{t1}editor\n{t1}{{\n{editor}{t1}}}\n{t}}}\n")
+
+        # Texture lines of every used (material, uv) pair
+        uv_count = max(len(self.uv_table), 1)
+        keys = self.materials.astype(numpy.int64) * uv_count + self.uvs
+        used, faces = numpy.unique(keys, return_inverse=True)
+        textures = []
+        for key in used.tolist():
+            uaxis, vaxis = self.uv_table[key % uv_count]
+            textures.append(f"{t2}\"material\" \"{self.material_table[key // uv_count]}\"\n{t2}\"uaxis\" \"{uaxis}\"\n"
+                            f"{t2}\"vaxis\" \"{vaxis}\"\n{t2}\"rotation\" \"0\"\n{t2}\"lightmapscale\" \"16\"\n"
+                            f"{t2}\"smoothing_groups\" \"0\"\n")
+        textures = numpy.array(textures + [None], dtype=object)[:-1]  # Keeps the strings as objects
+        faces = faces.reshape(keys.shape)
+
+        # The fields are turned into strings before formatting, coordinates repeat a lot so each value is converted once
+        coordinates, extents = numpy.unique(self.extents, return_inverse=True)
+        coordinates = numpy.array(list(map(str, coordinates.tolist())) + [None], dtype=object)[:-1]
+        extents = extents.reshape(self.extents.shape)
+
+        ids = self.ids
+        for start in range(0, len(ids), BoxBrushes.EXPORT_CHUNK):
+            end = start + BoxBrushes.EXPORT_CHUNK
+            chunk_ids = ids[start:end, None] + numpy.array([0, -6, -5, -4, -3, -2, -1])  # Solid id, then side ids
+            rows = numpy.empty((len(chunk_ids), 19), dtype=object)
+            rows[:, :7] = numpy.array(list(map(str, chunk_ids.ravel().tolist())), dtype=object).reshape(-1, 7)
+            rows[:, 7:13] = coordinates[extents[start:end]]
+            rows[:, 13:19] = textures[faces[start:end]]
+            yield "".join([template % tuple(row) for row in rows[:, field_columns].tolist()])
+
+
+class LazySolids:
+    """
+    The world solids of a VMF loaded with ``load_vmf(name, lazy=True)``, left in the memory-mapped file until they're
+    accessed. Each solid is parsed once, from its byte range in the index of the file (see :class:`importer.VMFIndex`),
+    and the bounding boxes of the index answer box queries without parsing anything else.
+
+    :param index: The index of the file
+    :type index: :class:`importer.VMFIndex`
+    :param merge_vertices: Vertices within this distance are linked when a solid is parsed, see :func:`load_vmf`
+    :type merge_vertices: :obj:`int` or :obj:`float`
+    :param welder: Welds the vertices between solids too, see :func:`~Solid.link_vertices`
+    :type welder: :class:`VertexWelder`
+    """
+
+    # Solids parsed together, so that loading them all never holds the text of the whole world
+    PARSE_BATCH = 4096
+
+    def __init__(self, index: VMFIndex, merge_vertices=0.0, welder: VertexWelder = None):
+        self.index = index
+        self.merge_vertices = merge_vertices
+        self.welder = welder
+        self.loaded = {}  # Solid number (order in the file) -> Solid, for the solids parsed so far
+
+    def __len__(self):
+        return len(self.index.solids)
+
+    def get(self, numbers: Iterable[int]) -> List[Solid, ...]:
+        """
+        Gets solids by their number, parsing the ones that weren't accessed yet
+
+        :param numbers: Solid numbers, from 0 to len - 1 in the order of the file
+        :type numbers: :obj:`iterable` of :obj:`int`
+        :return: The solids
+        :rtype: :obj:`list` of :class:`Solid`
+        """
+        numbers = list(numbers)
+        missing = [number for number in numbers if number not in self.loaded]
+        for start in range(0, len(missing), LazySolids.PARSE_BATCH):
+            batch = missing[start:start + LazySolids.PARSE_BATCH]
+            for number, category in zip(batch, self.index.parse(self.index.solids[batch].tolist())):
+                solid = self.loaded[number] = Solid(category.dic, category.children)
+                if self.merge_vertices != 0:
+                    solid.link_vertices(self.merge_vertices, self.welder)
+        return [self.loaded[number] for number in numbers]
+
+    def in_box(self, mins: Vertex, maxs: Vertex) -> List[Solid, ...]:
+        """
+        Gets the solids whose bounding box overlaps the box, the solids already parsed are checked with their current
+        vertices and the others with the bounding boxes of the index
+
+        :param mins: Lowest corner of the box
+        :type mins: :class:`Vertex`
+        :param maxs: Highest corner of the box
+        :type maxs: :class:`Vertex`
+        :return: The solids in the box, in the order of the file
+        :rtype: :obj:`list` of :class:`Solid`
+        """
+        overlap = numpy.all((self.index.mins <= maxs.export()) & (self.index.maxs >= mins.export()), axis=1)
+        overlap[list(self.loaded)] = False
+        numbers = set(numpy.flatnonzero(overlap).tolist())
+        for number, solid in self.loaded.items():
+            low, high = solid.get_bounds()
+            if (low.x <= maxs.x and low.y <= maxs.y and low.z <= maxs.z
+                    and high.x >= mins.x and high.y >= mins.y and high.z >= mins.z):
+                numbers.add(number)
+        return self.get(sorted(numbers))
+
+    def load_all(self) -> List[Solid, ...]:
+        """
+        :return: All the solids, in the order of the file
+        :rtype: :obj:`list` of :class:`Solid`
+        """
+        return self.get(range(len(self)))
+
+    def close(self):
+        """
+        Unmaps the file, the solids already parsed are kept
+        """
+        self.index.close()
+
+
+class SpatialIndex:
+    """
+    Uniform grid over the bounding boxes of solids and entities (or any item with bounds), for box, point, nearest
+    and overlap queries that only look at the items around the query, see :func:`~VMF.build_spatial_index`.
+
+    Each item is listed in every cell its bounding box touches. Items touching more than :attr:`MAX_CELLS` cells
+    (a skybox) are kept aside and checked by every query instead. Boxes are inclusive: touching boxes are in each
+    other's box queries, but they only overlap (see :func:`~SpatialIndex.get_overlapping`) if they share a volume.
+
+    The bounds are taken when an item is added, call :func:`~SpatialIndex.update` after moving it.
+
+    :param cell_size: Width of the cells in Hammer units
+    :type cell_size: :obj:`int` or :obj:`float`
+    :param resolve: Called with the stand-ins (items added with explicit bounds, ex: the number of a solid not parsed
+        yet) found by a query, returns the actual items, which take their place in the index
+    :type resolve: :obj:`callable`
+    """
+
+    CELL_SIZE = 512
+    MAX_CELLS = 512
+
+    def __init__(self, cell_size=CELL_SIZE, resolve=None):
+        self.cell_size = cell_size
+        self.resolve = resolve
+        self.bounds = {}  # Item -> (mins, maxs) as tuples
+        self.order = {}  # Item -> number, query results are sorted by it
+        self.cells = {}  # Cell -> items touching it
+        self.large = set()  # Items touching too many cells
+        self.stand_ins = set()  # Items to resolve
+        self.extent = None  # Lowest and highest cells used, never shrinks
+        self._count = 0
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __contains__(self, item):
+        return item in self.bounds
+
+    @staticmethod
+    def bounds_of(item):
+        """
+        Bounding box of a :class:`Solid` or :class:`Entity` (the box around its solids, or its origin)
+
+        :return: The lowest and highest corners as (x, y, z) tuples, or None if the item has no position
+        :rtype: :obj:`tuple` or :obj:`None`
+        """
+        if isinstance(item, Solid):
+            low, high = item.get_bounds()
+            return low.export(), high.export()
+        if isinstance(item, Entity):
+            if item.solids:
+                corners = [SpatialIndex.bounds_of(solid) for solid in item.solids]
+                return (tuple(map(min, zip(*[low for low, high in corners]))),
+                        tuple(map(max, zip(*[high for low, high in corners]))))
+            origin = getattr(item, "origin", None)
+            if origin is None:
+                origin = item.other.get("origin")
+            if isinstance(origin, Vertex):
+                return origin.export(), origin.export()
+        return None
+
+    def _cell_range(self, mins, maxs):
+        size = self.cell_size
+        return [range(math.floor(low / size), math.floor(high / size) + 1) for low, high in zip(mins, maxs)]
+
+    def add(self, item, bounds=None):
+        """
+        Adds an item, items without a position are left out
+
+        :param item: The item, a :class:`Solid` or :class:`Entity` unless bounds are given
+        :param bounds: The lowest and highest corners, found with :func:`~SpatialIndex.bounds_of` if not given
+        :type bounds: :obj:`tuple`
+        :return: Whether the item was added
+        :rtype: :obj:`bool`
+        """
+        order = self.order.get(item)
+        if order is not None:
+            self.remove(item)
+        if bounds is None:
+            bounds = self.bounds_of(item)
+            if bounds is None:
+                return False
+        elif self.resolve is not None:
+            self.stand_ins.add(item)
+        if order is None:
+            order = self._count
+            self._count += 1
+        mins, maxs = bounds
+        self.bounds[item] = mins, maxs
+        self.order[item] = order
+
+        ranges = self._cell_range(mins, maxs)
+        if math.prod(map(len, ranges)) > SpatialIndex.MAX_CELLS:
+            self.large.add(item)
+            return True
+        index = self.cells
+        for cell in itertools.product(*ranges):
+            items = index.get(cell)
+            if items is None:
+                index[cell] = {item}
+            else:
+                items.add(item)
+        low, high = tuple(r[0] for r in ranges), tuple(r[-1] for r in ranges)
+        if self.extent is not None:
+            low, high = tuple(map(min, self.extent[0], low)), tuple(map(max, self.extent[1], high))
+        self.extent = low, high
+        return True
+
+    def remove(self, item):
+        """
+        Removes an item, nothing happens if it isn't in the index
+        """
+        bounds = self.bounds.pop(item, None)
+        if bounds is None:
+            return
+        del self.order[item]
+        self.stand_ins.discard(item)
+        if item in self.large:
+            self.large.discard(item)
+            return
+        for cell in itertools.product(*self._cell_range(*bounds)):
+            items = self.cells[cell]
+            items.discard(item)
+            if not items:
+                del self.cells[cell]
+
+    def update(self, *items):
+        """
+        Takes the new bounds of items that were moved or changed, they keep their place in the query results
+        """
+        for item in items:
+            if item in self.bounds:
+                self.add(item)
+
+    def _candidates(self, mins, maxs):
+        # Items of the cells touching the box, with the large items
+        x, y, z = self._cell_range(mins, maxs)
+        found = set(self.large)
+        if len(x) * len(y) * len(z) > len(self.cells):
+            for cell, items in self.cells.items():
+                if cell[0] in x and cell[1] in y and cell[2] in z:
+                    found.update(items)
+        else:
+            cells = self.cells
+            for cell in itertools.product(x, y, z):
+                items = cells.get(cell)
+                if items:
+                    found.update(items)
+        return found
+
+    def _resolved(self, items):
+        # Puts the actual items in place of the stand-ins
+        stand_ins = list(dict.fromkeys(item for item in items if item in self.stand_ins))
+        if not stand_ins:
+            return items
+        replace = dict(zip(stand_ins, self.resolve(stand_ins)))
+        for stand_in, item in replace.items():
+            order = self.order[stand_in]
+            self.remove(stand_in)
+            if self.add(item):
+                self.order[item] = order
+        return [replace.get(item, item) for item in items]
+
+    def query_box(self, mins: Vertex, maxs: Vertex) -> list:
+        """
+        :param mins: Lowest corner of the box
+        :type mins: :class:`Vertex`
+        :param maxs: Highest corner of the box
+        :type maxs: :class:`Vertex`
+        :return: The items whose bounding box overlaps the box (touching included), in the order they were added
+        :rtype: :obj:`list`
+        """
+        low, high = mins.export(), maxs.export()
+        bounds = self.bounds
+        found = [item for item in self._candidates(low, high)
+                 if all(a <= d and b >= c for a, b, c, d in zip(*bounds[item], low, high))]
+        return self._resolved(sorted(found, key=self.order.__getitem__))
+
+    def query_point(self, point: Vertex) -> list:
+        """
+        :param point: The point
+        :type point: :class:`Vertex`
+        :return: The items whose bounding box contains the point (borders included), in the order they were added
+        :rtype: :obj:`list`
+        """
+        return self.query_box(point, point)
+
+    def _distance(self, item, point):
+        # Distance from the point to the bounding box of the item, 0 inside
+        mins, maxs = self.bounds[item]
+        return math.sqrt(sum(max(low - p, 0, p - high) ** 2 for low, high, p in zip(mins, maxs, point)))
+
+    def nearest(self, point: Vertex, count: int = 1) -> list:
+        """
+        Finds the items closest to a point, by the distance to their bounding box. The cells are searched in growing
+        shells around the point, until no item outside of them can be closer.
+
+        :param point: The point
+        :type point: :class:`Vertex`
+        :param count: Number of items to find
+        :type count: :obj:`int`
+        :return: Up to count items, the closest first
+        :rtype: :obj:`list`
+        """
+        point = point.export()
+        cells = self.cells
+        distances = {}  # Item -> (distance, order) of the items seen so far
+
+        def see(items):
+            for item in items:
+                if item not in distances:
+                    distances[item] = self._distance(item, point), self.order[item]
+
+        see(self.large)
+        if cells:
+            center = [math.floor(p / self.cell_size) for p in point]
+            low, high = self.extent
+            reach = max(max(c - l, h - c) for c, l, h in zip(center, low, high))
+            for radius in range(max(reach, 0) + 1):
+                if (2 * radius + 1) ** 3 > 8 * len(cells):  # Quicker to go through all the cells left
+                    for items in cells.values():
+                        see(items)
+                    break
+                ring = range(-radius, radius + 1)
+                for dx in ring:
+                    for dy in ring:
+                        for dz in (ring if radius in (abs(dx), abs(dy)) else (-radius, radius)):
+                            items = cells.get((center[0] + dx, center[1] + dy, center[2] + dz))
+                            if items:
+                                see(items)
+                closest = heapq.nsmallest(count, distances, key=distances.__getitem__)
+                # Items in no searched cell are at least radius cells away
+                if len(closest) == count and distances[closest[-1]][0] <= radius * self.cell_size:
+                    return self._resolved(closest)
+        return self._resolved(heapq.nsmallest(count, distances, key=distances.__getitem__))
+
+    @staticmethod
+    def _intersect(a, b):
+        return all(a_low < b_high and b_low < a_high for a_low, a_high, b_low, b_high in zip(a[0], a[1], b[0], b[1]))
+
+    def get_overlapping(self, item) -> list:
+        """
+        :param item: An item of the index
+        :return: The other items sharing a volume with it (their bounding boxes intersect, touching isn't enough), a
+            point entity overlaps the solids it's inside of. In the order they were added.
+        :rtype: :obj:`list`
+        """
+        box = self.bounds[item]
+        bounds = self.bounds
+        found = [other for other in self._candidates(*box) if other is not item and self._intersect(box, bounds[other])]
+        return self._resolved(sorted(found, key=self.order.__getitem__))
+
+    def find_overlaps(self) -> list:
+        """
+        Finds all the pairs of items sharing a volume, see :func:`~SpatialIndex.get_overlapping`
+
+        :return: (item, item) pairs, in the order the items were added
+        :rtype: :obj:`list` of :obj:`tuple`
+        """
+        bounds, order = self.bounds, self.order
+        pairs = set()
+
+        def check(items, others):
+            # Compares the boxes of the items with the boxes of the others at once
+            a_mins, a_maxs = (numpy.array(corners, dtype=float).reshape(-1, 3)
+                              for corners in zip(*[bounds[item] for item in items]))
+            b_mins, b_maxs = (numpy.array(corners, dtype=float).reshape(-1, 3)
+                              for corners in zip(*[bounds[item] for item in others]))
+            hits = numpy.all((a_mins[:, None] < b_maxs[None]) & (b_mins[None] < a_maxs[:, None]), axis=2)
+            for i, j in zip(*numpy.nonzero(hits)):
+                a, b = items[i], others[j]
+                if a is not b:
+                    pairs.add((a, b) if order[a] < order[b] else (b, a))
+
+        for items in self.cells.values():
+            if len(items) > 1:
+                items = list(items)
+                check(items, items)
+        if self.large:
+            check(list(self.large), list(bounds))
+
+        pairs = sorted(pairs, key=lambda pair: (order[pair[0]], order[pair[1]]))
+        if self.stand_ins:
+            items = self._resolved([item for pair in pairs for item in pair])
+            pairs = list(zip(items[::2], items[1::2]))
+        return pairs
+
+
+class Transform:
+    """
+    4x4 affine matrices applied to many solids at once with :func:`~Transform.apply`, the vertices of all the solids
+    go through a single NumPy operation. Matrices are combined by multiplying them, the rightmost one applies first,
+    ex: ``Transform.translation(0, 0, 64) @ Transform.rotation_z(center, 90)`` rotates then moves.
+
+    The matrices use the conventions of the :class:`Vertex` methods (angles in degrees, counterclockwise). Matrices
+    made only of integers keep integer coordinates integers, like :func:`~Vertex.move`.
+    """
+
+    @staticmethod
+    def translation(x=0, y=0, z=0) -> numpy.ndarray:
+        """
+        :return: The matrix moving by the given amount, see :func:`~Solid.move`
+        :rtype: :obj:`numpy.ndarray`
+        """
+        return numpy.array([[1, 0, 0, x], [0, 1, 0, y], [0, 0, 1, z], [0, 0, 0, 1]])
+
+    @staticmethod
+    def _around(center: Vertex, matrix) -> numpy.ndarray:
+        # Applies the 3x3 matrix around the center
+        center = numpy.array(center.export(), dtype=float)
+        transform = numpy.identity(4)
+        transform[:3, :3] = matrix
+        transform[:3, 3] = center - transform[:3, :3] @ center
+        return transform
+
+    @staticmethod
+    def rotation_x(center: Vertex, angle) -> numpy.ndarray:
+        """
+        :return: The matrix rotating around the x axis, see :func:`~Solid.rotate_x`
+        :rtype: :obj:`numpy.ndarray`
+        """
+        a = math.radians(angle)
+        return Transform._around(center, [[1, 0, 0], [0, math.cos(a), -math.sin(a)], [0, math.sin(a), math.cos(a)]])
+
+    @staticmethod
+    def rotation_y(center: Vertex, angle) -> numpy.ndarray:
+        """
+        :return: The matrix rotating around the y axis, see :func:`~Solid.rotate_y`
+        :rtype: :obj:`numpy.ndarray`
+        """
+        a = math.radians(angle)
+        return Transform._around(center, [[math.cos(a), 0, -math.sin(a)], [0, 1, 0], [math.sin(a), 0, math.cos(a)]])
+
+    @staticmethod
+    def rotation_z(center: Vertex, angle) -> numpy.ndarray:
+        """
+        :return: The matrix rotating around the z axis, see :func:`~Solid.rotate_z`
+        :rtype: :obj:`numpy.ndarray`
+        """
+        a = math.radians(angle)
+        return Transform._around(center, [[math.cos(a), -math.sin(a), 0], [math.sin(a), math.cos(a), 0], [0, 0, 1]])
+
+    @staticmethod
+    def scaling(center: Vertex, x=1.0, y=1.0, z=1.0) -> numpy.ndarray:
+        """
+        :return: The matrix scaling by ratios from the center, see :func:`~Solid.scale`
+        :rtype: :obj:`numpy.ndarray`
+        """
+        return Transform._around(center, numpy.diag([x, y, z]))
+
+    @staticmethod
+    def mirror(x=None, y=None, z=None) -> numpy.ndarray:
+        """
+        :return: The matrix mirroring across the planes at the given positions on each axis, see :func:`~Solid.flip`
+        :rtype: :obj:`numpy.ndarray`
+        """
+        rows = []
+        for axis, position in enumerate((x, y, z)):
+            row = [0, 0, 0, 0]
+            row[axis] = 1 if position is None else -1
+            row[3] = 0 if position is None else 2 * position
+            rows.append(row)
+        return numpy.array([*rows, [0, 0, 0, 1]])
+
+    @staticmethod
+    def apply(solids: Iterable[Solid], matrix: numpy.ndarray):
+        """
+        Transforms all the vertices of the solids with the matrix, each vertex instance once (vertices linked by
+        :func:`~Solid.link_vertices` are shared)
+
+        :param solids: The solids to transform
+        :type solids: :obj:`iterable` of :class:`Solid`
+        :param matrix: An affine matrix, see the other :class:`Transform` methods
+        :type matrix: :obj:`numpy.ndarray`
+        """
+        matrix = numpy.asarray(matrix)
+        if matrix.shape != (4, 4) or matrix[3].tolist() != [0, 0, 0, 1]:
+            raise ValueError("Not a 4x4 affine matrix")
+        vertices = [vert for solid in solids for side in solid.side for vert in side.plane]
+        if len(set(map(id, vertices))) != len(vertices):  # Linked vertices
+            vertices = list({id(vert): vert for vert in vertices}.values())
+        if not vertices:
+            return
+
+        # One list and array per axis, coordinates are read and written without building a tuple per vertex
+        axes = ("x", "y", "z")
+        columns = [list(map(operator.attrgetter(axis), vertices)) for axis in axes]
+        points = numpy.array(columns, dtype=float)
+        integral = matrix.dtype.kind in "iu"
+        for axis, row in enumerate(matrix[:3].tolist()):
+            unit = [0, 0, 0, 0]
+            unit[axis] = 1
+            if row == unit:  # The axis doesn't change
+                continue
+            values = matrix[axis, :3] @ points + row[3]
+            used = [columns[i] for i, factor in enumerate(row[:3]) if factor]
+            if integral and all(type(c) is int for column in used for c in column):
+                values = values.astype(numpy.int64)  # Integers stay integers, like with Vertex.move
+            name = axes[axis]
+            for vert, value in zip(vertices, values.tolist()):
+                setattr(vert, name, value)
+
+
 class SolidGenerator:
     """
     Generates solids from scratch, remember you still need to add them to :class:`VMF` using :func:`~VMF.add_solids`
@@ -2050,16 +3106,15 @@ class SolidGenerator:
         :rtype: :class:`Solid`
         """
         x, y, z = vertex.export()
-        f1 = Side(dic={"plane": f"({x + w} {y} {z + l}) ({x + w} {y} {z}) ({x} {y} {z})"})
-        f2 = Side(dic={"plane": f"({x + w} {y + h} {z}) ({x + w} {y + h} {z + l}) ({x} {y + h} {z + l})"})
-        f3 = Side(dic={"plane": f"({x} {y} {z}) ({x} {y + h} {z}) ({x} {y + h} {z + l})"})
-        f4 = Side(dic={"plane": f"({x + w} {y + h} {z}) ({x + w} {y} {z}) ({x + w} {y} {z + l})"})
-        f5 = Side(dic={"plane": f"({x} {y} {z + l}) ({x} {y + h} {z + l}) ({x + w} {y + h} {z + l})"})
-        f6 = Side(dic={"plane": f"({x} {y + h} {z}) ({x} {y} {z}) ({x + w} {y} {z})"})
+        x2, y2, z2 = x + w, y + h, z + l
+        planes = (((x2, y, z2), (x2, y, z), (x, y, z)),
+                  ((x2, y2, z), (x2, y2, z2), (x, y2, z2)),
+                  ((x, y, z), (x, y2, z), (x, y2, z2)),
+                  ((x2, y2, z), (x2, y, z), (x2, y, z2)),
+                  ((x, y, z2), (x, y2, z2), (x2, y2, z2)),
+                  ((x, y2, z), (x, y, z), (x2, y, z)))
 
-        solid = Solid()
-        solid.add_sides(f1, f2, f3, f4, f5, f6)
-        solid.editor = Editor()
+        solid = Solid.from_sides([Side.from_plane(plane) for plane in planes], Editor.default())
 
         if center:
             solid.center = Vertex(x, y, z)
@@ -2087,15 +3142,14 @@ class SolidGenerator:
         :rtype: :class:`Solid`
         """
         x, y, z = vertex.export()
-        f1 = Side(dic={"plane": f"({x} {y} {z}) ({x} {y + h} {z}) ({x} {y + h} {z + l})"})
-        f2 = Side(dic={"plane": f"({x} {y + h} {z}) ({x} {y} {z}) ({x + w} {y} {z})"})
-        f3 = Side(dic={"plane": f"({x} {y} {z + l}) ({x} {y + h} {z + l}) ({x + w} {y} {z + l})"})
-        f4 = Side(dic={"plane": f"({x + w} {y} {z + l}) ({x + w} {y} {z}) ({x} {y} {z})"})
-        f5 = Side(dic={"plane": f"({x} {y + h} {z + l}) ({x} {y + h} {z}) ({x + w} {y} {z})"})
+        x2, y2, z2 = x + w, y + h, z + l
+        planes = (((x, y, z), (x, y2, z), (x, y2, z2)),
+                  ((x, y2, z), (x, y, z), (x2, y, z)),
+                  ((x, y, z2), (x, y2, z2), (x2, y, z2)),
+                  ((x2, y, z2), (x2, y, z), (x, y, z)),
+                  ((x, y2, z2), (x, y2, z), (x2, y, z)))
 
-        solid = Solid()
-        solid.add_sides(f1, f2, f3, f4, f5)
-        solid.editor = Editor()
+        solid = Solid.from_sides([Side.from_plane(plane) for plane in planes], Editor.default())
 
         SolidGenerator.dev_material(solid, dev)
 
@@ -2193,18 +3247,14 @@ class SolidGenerator:
         top_cut /= 2
 
         x, y, z = vertex.export()
-        f1 = Side(dic={"plane": f"({x - ww} {y} {z}) ({x - w} {y + side_cut} {z}) ({x - top_cut} {y + hh} {z})"})
-        f2 = Side(dic={"plane": f"({x - ww} {y + side_cut} {z - ll}) ({x - ww} {y} {z - ll}) ({x + ww} {y} {z - ll})"})
-        f3 = Side(dic={"plane": f"({x - ww} {y} {z - ll}) ({x - ww} {y + side_cut} {z - ll}) "
-                                f"({x - ww} {y + side_cut} {z})"})
-        f4 = Side(dic={"plane": f"({x + ww} {y + side_cut} {z - ll}) ({x + ww} {y} {z - ll}) ({x + ww} {y} {z})"})
-        f5 = Side(dic={"plane": f"({x - top_cut} {y + hh} {z - ll}) ({x + top_cut} {y + hh} {z - ll}) "
-                                f"({x + top_cut} {y + hh} {z})"})
-        f6 = Side(dic={"plane": f"({x + ww} {y} {z - ll}) ({x - ww} {y} {z - ll}) ({x - ww} {y} {z})"})
-        f7 = Side(dic={"plane": f"({x - ww} {y + side_cut} {z - ll}) ({x - top_cut} {y + hh} {z - ll}) "
-                                f"({x - top_cut} {y + hh} {z})"})
-        f8 = Side(dic={"plane": f"({x + top_cut} {y + hh} {z - ll}) ({x + ww} {y + side_cut} {z - ll}) "
-                                f"({x + ww} {y + side_cut} {z})"})
+        f1 = Side.from_plane(((x - ww, y, z), (x - w, y + side_cut, z), (x - top_cut, y + hh, z)))
+        f2 = Side.from_plane(((x - ww, y + side_cut, z - ll), (x - ww, y, z - ll), (x + ww, y, z - ll)))
+        f3 = Side.from_plane(((x - ww, y, z - ll), (x - ww, y + side_cut, z - ll), (x - ww, y + side_cut, z)))
+        f4 = Side.from_plane(((x + ww, y + side_cut, z - ll), (x + ww, y, z - ll), (x + ww, y, z)))
+        f5 = Side.from_plane(((x - top_cut, y + hh, z - ll), (x + top_cut, y + hh, z - ll), (x + top_cut, y + hh, z)))
+        f6 = Side.from_plane(((x + ww, y, z - ll), (x - ww, y, z - ll), (x - ww, y, z)))
+        f7 = Side.from_plane(((x - ww, y + side_cut, z - ll), (x - top_cut, y + hh, z - ll), (x - top_cut, y + hh, z)))
+        f8 = Side.from_plane(((x + top_cut, y + hh, z - ll), (x + ww, y + side_cut, z - ll), (x + ww, y + side_cut, z)))
 
         solid = Solid()
         f3.set_texture(side_texture)
@@ -2216,14 +3266,13 @@ class SolidGenerator:
         if side_cut == 0 and top_cut == 0:
             solid.add_sides(f1, f2, f6, f7, f8)
         elif side_cut == 0:
-            print("ss")
             solid.add_sides(f1, f2, f5, f6, f7, f8)
         elif top_cut == 0:
             solid.add_sides(f1, f2, f3, f4, f6, f7, f8)
         else:
             solid.add_sides(f1, f2, f3, f4, f5, f6, f7, f8)
 
-        solid.editor = Editor()
+        solid.editor = Editor.default()
 
         if center:
             solid.center = Vertex(x, y, z)
@@ -2333,6 +3382,191 @@ class EntityGenerator:
         return s
 
 
+EXPORT_BUFFER_SIZE = 1 << 20  # Size of the output file buffer used by VMF.export, in bytes
+EXPORT_CHUNK = 2048  # Formatted parts (about 8 per solid) joined into one string before they're written
+EXPORT_BATCH_MIN = 2000  # Smallest batch of solids or boxes formatted by one worker of a parallel export
+EXPORT_BATCHES_PER_WORKER = 4  # Batches per worker, so that workers finishing early pick up more work
+PROGRESS_INTERVAL = 0.1  # Seconds between two export progress reports
+
+_INDENTS = ["\t" * depth for depth in range(16)]
+
+
+def _indent(depth: int) -> str:
+    """
+    Cached indentation string of the given depth
+    """
+    while depth >= len(_INDENTS):
+        _INDENTS.append("\t" * len(_INDENTS))
+    return _INDENTS[depth]
+
+
+def _category_text(name: str, info_list, depth: int) -> str:
+    """
+    Formats the opening of a category: its name and bracket at the given depth, then its values (from `export`)
+    one level deeper. The closing bracket is written after the children.
+    """
+    t = _indent(depth)
+    d = _indent(depth + 1)
+    lines = [f"{t}{name}\n{t}{{\n"]
+    for item in info_list:
+        if not item:
+            continue
+
+        if type(item) is dict:
+            lines.extend([f"{d}\"{key}\" \"{value}\"\n" for key, value in item.items()])
+        else:
+            lines.append(f"{d}\"{item[0]}\" \"{item[1]}\"\n")
+    return "".join(lines)
+
+
+def _solid_parts(solid: Solid, depth: int, cache: dict, parts: list) -> bool:
+    """
+    Formats a whole solid category at once and appends the text to parts. Returns False, leaving parts unchanged,
+    for solids that need the generic walk of :func:`~VMF.export` (sides with a displacement or of a subclass,
+    vertices not in plane format).
+
+    The texture lines of sides and the shared editors are formatted once per export and kept in cache.
+    """
+    t = _indent(depth)
+    t1 = _indent(depth + 1)
+    t2 = _indent(depth + 2)
+    start = len(parts)
+    parts.append(f"{t}solid\n{t}{{\n{t1}\"id\" \"{solid.id}\"\n")
+    if solid.other:
+        parts.extend([f"{t1}\"{key}\" \"{value}\"\n" for key, value in solid.other.items()])
+    for side in solid.side:
+        v1, v2, v3 = side.plane
+        if side.dispinfo is not None or type(side) is not Side or v1.normal or v2.normal or v3.normal:
+            del parts[start:]
+            return False
+        # Same values and order as Side.export
+        key = (depth, side.material, side.uaxis, side.vaxis, side.rotation, side.lightmapscale, side.smoothing_groups)
+        texture = cache.get(key)
+        if texture is None:
+            texture = (f"{t2}\"material\" \"{side.material}\"\n{t2}\"uaxis\" \"{side.uaxis}\"\n"
+                       f"{t2}\"vaxis\" \"{side.vaxis}\"\n{t2}\"rotation\" \"{side.rotation}\"\n"
+                       f"{t2}\"lightmapscale\" \"{side.lightmapscale}\"\n"
+                       f"{t2}\"smoothing_groups\" \"{side.smoothing_groups}\"\n")
+            cache[key] = texture
+        if side.other:
+            texture += "".join([f"{t2}\"{key}\" \"{value}\"\n" for key, value in side.other.items()])
+        parts.append(f"{t1}side\n{t1}{{\n{t2}\"id\" \"{side.id}\"\n"
+                     f"{t2}\"plane\" \"({v1.x} {v1.y} {v1.z}) ({v2.x} {v2.y} {v2.z}) ({v3.x} {v3.y} {v3.z})\"\n"
+                     f"{texture}{t1}}}\n")
+    editor = solid.editor
+    if editor is not None:
+        if editor.shared:
+            key = (depth, editor)
+            text = cache.get(key)
+            if text is None:
+                text = cache[key] = _category_text(Editor.NAME, editor.export(), depth + 1) + f"{t1}}}\n"
+        else:
+            text = _category_text(Editor.NAME, editor.export(), depth + 1) + f"{t1}}}\n"
+        parts.append(text)
+    parts.append(f"{t}}}\n")
+    return True
+
+
+# World solids of the parallel export, inherited by the forked workers instead of being sent to them
+_export_solids = None
+
+
+def _fork_context():
+    """
+    The "fork" multiprocessing context, or None where processes can only be spawned (Windows)
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def _export_solid_batch(start: int, end: int, depth: int, path: str):
+    """
+    Worker of the parallel export, formats the world solids from start to end into the file at path
+    """
+    cache = {}
+    parts = []
+    with open(path, "w", buffering=EXPORT_BUFFER_SIZE) as file:
+        for solid in _export_solids[start:end]:
+            if type(solid) is not Solid or not _solid_parts(solid, depth, cache, parts):
+                parts.extend(VMF()._export_chunks(solid, depth=depth))
+            if len(parts) >= EXPORT_CHUNK:
+                file.write("".join(parts))
+                parts.clear()
+        file.write("".join(parts))
+
+
+def _export_box_batch(boxes: BoxBrushes, depth: int, path: str):
+    """
+    Worker of the parallel export, formats a part of the world boxes (see :func:`~BoxBrushes.slice`) into the file
+    at path
+    """
+    with open(path, "w", buffering=EXPORT_BUFFER_SIZE) as file:
+        for text in boxes.export_text(depth):
+            file.write(text)
+
+
+class _ExportBatch:
+    """
+    A batch of world solids or boxes being formatted by a worker of the parallel export, stands for them among the
+    world children
+    """
+
+    def __init__(self, future, path: str, count: int):
+        self.future = future
+        self.path = path
+        self.count = count
+
+    def copy_to(self, file):
+        """
+        Waits for the batch and appends its text to the output file
+        """
+        self.future.result()
+        file.flush()
+        with open(self.path, "rb") as fragment:
+            shutil.copyfileobj(fragment, file.buffer, EXPORT_BUFFER_SIZE)
+        os.remove(self.path)
+
+
+class ExportProgress:
+    """
+    Counts the items written by an export and reports (done, total) to a callback, at most once every `interval`
+    seconds and once more when the export is finished. total is None when it isn't known (streamed solids).
+    """
+
+    def __init__(self, callback, total, interval: float = PROGRESS_INTERVAL):
+        self.callback = callback
+        self.total = total
+        self.done = 0
+        self.interval = interval
+        self._next = 0.0  # perf_counter time of the next report
+
+    def add(self, count=1):
+        self.done += count
+        now = time.perf_counter()
+        if now >= self._next:
+            self._next = now + self.interval
+            self.callback(self.done, None if self.total is None else max(self.total, self.done))
+
+    def finish(self):
+        self.callback(self.done, self.done)
+
+
+def print_progress(done: int, total):
+    """
+    Export progress callback printing a progress bar, used when :attr:`VMF.info_in_console` is on
+    """
+    if total is None:
+        sys.stdout.write(f"{done} items ...\r")
+    else:
+        bar_len = 60  # Some progress bar I found on StackOverflow
+        filled_len = int(round(bar_len * done / float(total or 1)))
+        percents = round(100.0 * done / float(total or 1), 1)
+        bar = '=' * filled_len + '-' * (bar_len - filled_len)
+        sys.stdout.write('[%s] %s%s ...\r' % (bar, percents, '%'))
+    sys.stdout.flush()
+
+
 class VMF:
     """
     Equivalent to a single .VMF file, holds all categories and all sub-categories
@@ -2342,9 +3576,6 @@ class VMF:
 
     def __init__(self):
         # EXPORT VARIABLES
-        self.__indent = 0  # Keeps track of indent
-        self.__size = 0  # The approximate amount of solids (used for the progress bar)
-        self.__count = 0  # Progress bar variable
         self.__file = None  # The output file
 
         # CATEGORIES
@@ -2359,6 +3590,7 @@ class VMF:
 
         # OTHER VARIABLES
         self.file = None
+        self.spatial_index = None  # See build_spatial_index
 
     def get_solids(self, include_hidden=False, include_solid_entities=True) -> List[Solid, ...]:
         """
@@ -2368,10 +3600,13 @@ class VMF:
         :type include_hidden: :obj:`bool`
         :param include_solid_entities: Whether to include solid entities (ex: trigger_teleport) or not
         :type include_solid_entities: :obj:`bool`
-        :return: Solids in the VMF
+        :return: Solids in the VMF, the world boxes are turned into solids first, see :func:`~World.materialize_boxes`,
+            and the solids of a lazily loaded VMF are all parsed, see :func:`~World.load_lazy_solids`
         :rtype: :obj:`list` of :class:`Solid`
         """
         li = []
+        self.world.load_lazy_solids()
+        self.world.materialize_boxes()
         li.extend(self.world.solids)
         if include_hidden:
             for s in self.world.hidden:
@@ -2390,6 +3625,31 @@ class VMF:
 
         return li
 
+    def get_solids_in_box(self, mins: Vertex, maxs: Vertex) -> List[Solid, ...]:
+        """
+        Gets the world solids whose bounding box overlaps the box, on a lazily loaded VMF only these solids are parsed
+        (see :func:`load_vmf`). Uses the spatial index if there's one (see :func:`~VMF.build_spatial_index`).
+
+        :param mins: Lowest corner of the box
+        :type mins: :class:`Vertex`
+        :param maxs: Highest corner of the box
+        :type maxs: :class:`Vertex`
+        :return: The solids in the box
+        :rtype: :obj:`list` of :class:`Solid`
+        """
+        if self.spatial_index is not None:
+            return [item for item in self.spatial_index.query_box(mins, maxs) if isinstance(item, Solid)]
+        li = []
+        if self.world.lazy is not None:
+            li.extend(self.world.lazy.in_box(mins, maxs))
+        self.world.materialize_boxes()
+        for solid in self.world.solids:
+            low, high = solid.get_bounds()
+            if (low.x <= maxs.x and low.y <= maxs.y and low.z <= maxs.z
+                    and high.x >= mins.x and high.y >= mins.y and high.z >= mins.z):
+                li.append(solid)
+        return li
+
     def get_entities(self, include_hidden=False, include_solid_entities=False) -> List[Entity, ...]:
         """
         Gets all the entities
@@ -2466,6 +3726,21 @@ class VMF:
         v.divide(len(group))
         return v
 
+    def link_vertices(self, group: list, similar=0.0):
+        """
+        Welds the similar vertices of all the solids, between solids as well as inside them. Similar vertices of
+        different solids are moved to the same position, but each solid keeps its own instances (see
+        :func:`~Solid.link_vertices`), so the solids can still be edited one by one
+
+        :param group: All the solids to include
+        :type group: :obj:`list` of :class:`Solid`
+        :param similar: Distance between vertices to be linked (in Hammer units), 0 only links equal vertices
+        :type similar: :obj:`int` or :obj:`float`
+        """
+        welder = VertexWelder(similar)
+        for solid in group:
+            solid.link_vertices(similar, welder)
+
     def sort_by_attribute(self, category_list: list, attr: str):
         """
         Sorts the list based on one of their attributes
@@ -2495,6 +3770,8 @@ class VMF:
             v_id = self.visgroups.new_visgroup(name).visgroupid
 
         for item in args:
+            if item.editor.shared:
+                item.editor = item.editor.copy()
             item.editor.visgroupid = v_id
 
     def add_solids(self, *args: Solid):
@@ -2504,6 +3781,9 @@ class VMF:
         :param args: Solids to add
         """
         self.world.solids.extend(args)
+        if self.spatial_index is not None:
+            for solid in args:
+                self.spatial_index.add(solid)
 
     def add_entities(self, *args: Entity):
         """
@@ -2512,6 +3792,42 @@ class VMF:
         :param args: Entities to add
         """
         self.entity.extend(args)
+        if self.spatial_index is not None:
+            for entity in args:
+                self.spatial_index.add(entity)
+
+    def build_spatial_index(self, cell_size=SpatialIndex.CELL_SIZE) -> SpatialIndex:
+        """
+        Indexes the world solids and the entities with a :class:`SpatialIndex`, kept as :attr:`spatial_index`.
+        :func:`~VMF.add_solids` and :func:`~VMF.add_entities` add to it, solids or entities that are moved or
+        changed need :func:`~SpatialIndex.update`.
+
+        On a lazily loaded VMF (see :func:`load_vmf`) the solids still in the file are indexed with the bounding boxes
+        of the file index, and only parsed when a query finds them.
+
+        :param cell_size: Width of the cells in Hammer units
+        :type cell_size: :obj:`int` or :obj:`float`
+        :return: The spatial index
+        :rtype: :class:`SpatialIndex`
+        """
+        index = SpatialIndex(cell_size)
+        self.world.materialize_boxes()
+        lazy = self.world.lazy
+        if lazy is not None:
+            index.resolve = lazy.get
+            known = numpy.isfinite(lazy.index.mins).all(axis=1) & numpy.isfinite(lazy.index.maxs).all(axis=1)
+            known[list(lazy.loaded)] = False  # Their current bounds are used
+            unknown = numpy.flatnonzero(~known).tolist()
+            solids = dict(zip(unknown, lazy.get(unknown)))
+            for number, mins, maxs in zip(range(len(lazy)), lazy.index.mins.tolist(), lazy.index.maxs.tolist()):
+                if number in solids:
+                    index.add(solids[number])
+                else:
+                    index.add(number, (tuple(mins), tuple(maxs)))
+        for item in itertools.chain(self.world.solids, self.get_entities(include_solid_entities=True)):
+            index.add(item)
+        self.spatial_index = index
+        return index
 
     def add_section(self, section: TempCategory):
         """
@@ -2584,92 +3900,191 @@ class VMF:
         self.cameras = Cameras()
         self.cordons = Cordons()
 
-    def export(self, filename: str):
+    def export_size(self) -> int:
+        """
+        Gets the number of items the export progress counts: the top level categories, entities and hidden items,
+        and the world children with every box. It only adds up the lengths of the lists add_solids, add_entities
+        and the box store append to, so it doesn't depend on the size of the map.
+
+        :return: The total of the export progress
+        :rtype: :obj:`int`
+        """
+        size = 6 + len(self.entity) + len(self.hidden)  # versioninfo, visgroups, viewsettings, world, cameras, cordons
+        if self.world is not None:
+            size += len(self.world.solids) + len(self.world.boxes) + len(self.world.hidden) + len(self.world.group)
+            if self.world.lazy is not None:
+                size += len(self.world.lazy)
+        return size
+
+    def export(self, filename: str, solids: Iterable[Solid] = (), workers: int = 1, progress=None):
         """
         Exports the VMF to a .VMF file
 
         :param filename: Exported file name, use a different filename or it will overwrite the existing file
         :type filename: :obj:`str`
+        :param solids: Extra solids streamed into the world after its own children, each one is formatted as soon as
+            it's produced and never stored in the VMF (useful with generators to keep memory usage low)
+        :type solids: :obj:`iterable` of :class:`Solid`
+        :param workers: Number of processes formatting the world solids and boxes, in contiguous batches written in
+            order, so the file is the same as with a single process. The world solids are only shared with the
+            workers where processes can be forked, otherwise they're formatted by the exporting process.
+        :type workers: :obj:`int`
+        :param progress: Called with (done, total) as the export goes, see :class:`ExportProgress`. Defaults to a
+            progress bar if :attr:`info_in_console` is on.
+        :type progress: :obj:`callable`
         """
-        self.__indent = 1  # Represents the indent of the data and not the categories (which use indent-1)
-
         start_time = time.time()  # To get how long the export took
+        if self.world is not None:
+            self.world.load_lazy_solids()
 
         if VMF.info_in_console:
             print("Exporting VMF")
-
-            for item in (self.versioninfo, self.visgroups, self.viewsettings, self.world,
-                         *self.entity, *self.hidden, self.cameras, self.cordons):
-                self._get_export_size(item)  # Gets the total amount of children
-
-            if self.__size == 0:  # We want to avoid division by 0 in progress bar
-                self.__size += 1
-
-        # I initially wrote everything to a string, which I then added to the file, turns out writing directly to the
-        # file is much faster by a long shot (the biggest file ~31mb takes about 8 seconds, before it took over 5 mins)
-        with open(filename, "w+") as self.file:
-            for item in (self.versioninfo, self.visgroups, self.viewsettings, self.world,
-                         *self.entity, *self.hidden, self.cameras, self.cordons):
-                self._nest_export(item)
-
+            if progress is None:
+                progress = print_progress
+        if progress is not None:
+            total = self.export_size() + len(solids) if hasattr(solids, "__len__") else None
+            progress = ExportProgress(progress, total)
+
+        parallel = (workers > 1 and self.world is not None
+                    and len(self.world.solids) + len(self.world.boxes) >= 2 * EXPORT_BATCH_MIN)
+        if parallel:
+            global _export_solids
+            _export_solids = self.world.solids
+            context = _fork_context()
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            folder = tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(filename)))
+        try:
+            world_children = None
+            if parallel:
+                world_children = self._submit_export_batches(executor, folder.name, workers, context is not None)
+
+            # Categories are formatted into strings holding many of them, which go through a large file buffer
+            with open(filename, "w+", buffering=EXPORT_BUFFER_SIZE) as self.file:
+                write = self.file.write
+                for item in (self.versioninfo, self.visgroups, self.viewsettings, self.world,
+                             *self.entity, *self.hidden, self.cameras, self.cordons):
+                    if item is self.world:
+                        chunks = self._export_chunks(item, solids, progress=progress, children=world_children)
+                    else:
+                        chunks = self._export_chunks(item, progress=progress)
+                    for text in chunks:
+                        if type(text) is str:
+                            write(text)
+                        else:
+                            text.copy_to(self.file)
+        finally:
+            if parallel:
+                executor.shutdown(cancel_futures=True)
+                folder.cleanup()
+                _export_solids = None
+
+        if progress is not None:
+            progress.finish()
         if VMF.info_in_console:
             print(f"Done in {round(time.time() - start_time, 3)} seconds")
 
-    def _nest_export(self, category):
-        if VMF.info_in_console:
-            self._progress()  # Progress bar
-        if category is not None:  # Some classes export None (ex: Hidden class export_children function)
-            # In the VMF it's first information (ex: id, classname, etc...) then children (ex: side, editor, etc...)
-            # I don't know if it's necessary but it makes comparing the exported map to the original much easier
-            # This is why I've chosen to keep the same order as the hammer generated VMF for pretty much everything
-            self._format_converter(category.NAME, category.export())
-
-            for child in category.export_children():
-                if not hasattr(child, "NAME") and isinstance(child, list) and len(child) == 1:
-                    child = child[0]
-                self.__count += 1  # For the progress bar
-                self.__indent += 1
-                self._nest_export(child)  # Recursion
-                self.__indent -= 1
-
-            # When there aren't any more children we close the curly brackets
-            self.file.write("\t" * (self.__indent - 1) + "}\n")
-
-    def _get_export_size(self, category):  # Same concept as _nest_export just without writing to file
-        if category is not None:
-            for child in category.export_children():
-                self.__size += 1
-                self._get_export_size(child)
-
-    def _progress(self, suffix=''):  # Some progress bar I found on StackOverflow
-        bar_len = 60
-        filled_len = int(round(bar_len * self.__count / float(self.__size)))
-
-        percents = round(100.0 * self.__count / float(self.__size), 1)
-        bar = '=' * filled_len + '-' * (bar_len - filled_len)
-
-        sys.stdout.write('[%s] %s%s ...%s\r' % (bar, percents, '%', suffix))
-        sys.stdout.flush()
+    def _submit_export_batches(self, executor, folder: str, workers: int, forked: bool) -> tuple:
+        """
+        Submits the world solids and boxes to the workers of a parallel export in contiguous batches, the solids
+        only if the workers are forked
 
-    def _format_converter(self, name, info_list):
-        # The category name is always one less indent from the data/children, and since self.indent keeps track of the
-        # data indent and not the category indent (doesn't matter which one you track as long as it's always the same)
-        t = "\t" * (self.__indent - 1)
-        self.file.write(f"{t}{name}\n{t}{{\n")
-        t += "\t"
+        :return: The world children, with the batches in place of the solids and boxes
+        :rtype: :obj:`tuple`
+        """
+        world = self.world
+        rest = world.export_children()[len(world.solids) + 1:]  # After the solids and the boxes
+        batches = []
 
-        for item in info_list:
-            if not item:
-                continue
+        def batch_size(count):
+            return max(EXPORT_BATCH_MIN, -(-count // (workers * EXPORT_BATCHES_PER_WORKER)))
 
-            if type(item) is dict:
-                for i, j in item.items():
-                    self.file.write(f"{t}\"{i}\" \"{str(j)}\"\n")
+        if forked:
+            size = batch_size(len(world.solids))
+            for start in range(0, len(world.solids), size):
+                path = os.path.join(folder, f"{len(batches)}.vmf")
+                future = executor.submit(_export_solid_batch, start, start + size, 1, path)
+                batches.append(_ExportBatch(future, path, len(world.solids[start:start + size])))
+        else:
+            batches.extend(world.solids)
+
+        size = batch_size(len(world.boxes))
+        for start in range(0, len(world.boxes), size):
+            path = os.path.join(folder, f"{len(batches)}.vmf")
+            boxes = world.boxes.slice(start, start + size)
+            batches.append(_ExportBatch(executor.submit(_export_box_batch, boxes, 1, path), path, len(boxes)))
+        return (*batches, *rest)
+
+    def _export_chunks(self, category, extra_children=(), depth=0, progress=None, children=None):
+        """
+        Walks a category and its children with an explicit stack, and yields the VMF text in chunks of about
+        `EXPORT_CHUNK` parts. Solids are formatted in one go, see :func:`_solid_parts`. Batches of a parallel
+        export are yielded as they are, in order with the text.
+
+        :param depth: The indent of the category name
+        :param progress: Counts the category, and the world children, see :func:`export_size`
+        :type progress: :class:`ExportProgress`
+        :param children: Replaces the children of the category (see :func:`_submit_export_batches`)
+        """
+        if progress is not None:
+            progress.add()
+            if not isinstance(category, World):
+                progress = None
+        if category is None:  # Some classes export None (ex: Hidden class export_children function)
+            return
+
+        # In the VMF it's first information (ex: id, classname, etc...) then children (ex: side, editor, etc...)
+        # I don't know if it's necessary but it makes comparing the exported map to the original much easier
+        # This is why I've chosen to keep the same order as the hammer generated VMF for pretty much everything
+        parts = [_category_text(category.NAME, category.export(), depth)]
+        if children is None:
+            children = category.export_children()
+        stack = [(itertools.chain(children, extra_children), depth)]  # (children iterator, depth)
+        cache = {}  # See _solid_parts
+        while stack:
+            children, depth = stack[-1]
+            for child in children:
+                if isinstance(child, BoxBrushes):  # Written as text straight from the arrays
+                    yield "".join(parts)
+                    parts.clear()
+                    left = len(child)
+                    for text in child.export_text(depth + 1):
+                        yield text
+                        if progress is not None:
+                            progress.add(min(left, child.EXPORT_CHUNK))
+                            left -= child.EXPORT_CHUNK
+                    continue
+                if isinstance(child, _ExportBatch):
+                    yield "".join(parts)
+                    parts.clear()
+                    yield child
+                    if progress is not None:
+                        progress.add(child.count)
+                    continue
+                if progress is not None and len(stack) == 1:
+                    progress.add()
+                if isinstance(child, list) and len(child) == 1 and not hasattr(child, "NAME"):
+                    child = child[0]
+                if child is None:
+                    continue
+
+                if type(child) is Solid and _solid_parts(child, depth + 1, cache, parts):
+                    if len(parts) >= EXPORT_CHUNK:
+                        yield "".join(parts)
+                        parts.clear()
+                    continue
+
+                parts.append(_category_text(child.NAME, child.export(), depth + 1))
+                stack.append((iter(child.export_children()), depth + 1))
+                break
             else:
-                self.file.write(f"{t}\"{item[0]}\" \"{str(item[1])}\"\n")
+                # When there aren't any more children we close the curly brackets
+                stack.pop()
+                parts.append(_indent(depth) + "}\n")
+        yield "".join(parts)
 
 
-def load_vmf(name: str, merge_vertices=0.0001) -> VMF:
+
+def load_vmf(name: str, merge_vertices=0.0001, lazy=False, merge_solids=False) -> VMF:
     """
     Loads a .VMF file
 
@@ -2677,6 +4092,13 @@ def load_vmf(name: str, merge_vertices=0.0001) -> VMF:
     :type name: :obj:`str`
     :param merge_vertices: Vertices on a solid within this distance are merged into a single vertex class, set to 0 for no merging
     :type merge_vertices: :obj:`int` or :obj:`float`
+    :param lazy: Memory-maps the file and only indexes the world solids, they're parsed when they're accessed through
+        :func:`~VMF.get_solids` or :func:`~VMF.get_solids_in_box` (or exported), see :class:`LazySolids`.
+        Everything else is loaded as usual.
+    :type lazy: :obj:`bool`
+    :param merge_solids: Also welds the vertices of different solids to the same position, without sharing instances
+        between solids, see :func:`~VMF.link_vertices`
+    :type merge_solids: :obj:`bool`
     :return: A loaded VMF
     :rtype: :class:`VMF`
     """
@@ -2684,15 +4106,38 @@ def load_vmf(name: str, merge_vertices=0.0001) -> VMF:
         print("Loading VMF")
 
     v = VMF()
-    f = file_parser(name)
-    for section in f:
-        print("Adding section: " + str(section))
-        v.add_section(section)
-
-    print("V IS: " + str(v.world))
-    if merge_vertices != 0:
-        for solid in v.get_solids(True):
-            solid.link_vertices(merge_vertices)
+    welder = VertexWelder(merge_vertices) if merge_solids else None
+    if lazy:
+        index = index_file(name)
+        world = next(((start, end) for category, start, end in index.categories if category == World.NAME), None)
+        sections = index.parse([(start, end) for category, start, end in index.categories if (start, end) != world])
+        if world is not None:
+            # The world without its solids, from the bytes around them
+            edges = [world[0], *index.solids.ravel().tolist(), world[1]]
+            sections.extend(index.parse(list(zip(edges[::2], edges[1::2]))))
+        for section in sections:
+            log.debug("Adding section: %s", section)
+            v.add_section(section)
+        if v.world is not None and len(index.solids):
+            v.world.lazy = LazySolids(index, merge_vertices, welder)
+            log.debug("%d world solids left in the file", len(index.solids))
+        else:
+            index.close()
+        if merge_vertices != 0:
+            # The world solids are linked when they're parsed
+            solids = [s for e in v.entity for s in e.solids]
+            if v.world is not None:
+                solids.extend(h.solids for h in v.world.hidden if h.solids is not None)
+            for solid in solids:
+                solid.link_vertices(merge_vertices, welder)
+    else:
+        f = file_parser(name)
+        for section in f:
+            log.debug("Adding section: %s", section)
+            v.add_section(section)
+        if merge_vertices != 0:
+            for solid in v.get_solids(True):
+                solid.link_vertices(merge_vertices, welder)
 
     if VMF.info_in_console:
         print("VMF Loaded")
@@ -0,0 +1,58 @@
+# benchmarks/batch_transform.py
+"""
+Rotates, scales and moves every solid of a map of textured cubes, one solid at a time with Solid.rotate_z,
+Solid.scale and Solid.move, and all at once with the combined matrix given to Transform.apply, and checks that
+both give the same vertices.
+
+Run from the project root:
+    python benchmarks/batch_transform.py [solid count]
+"""
+import contextlib
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyVMF import Transform, Vertex
+from vmf_export import build_vmf
+
+CENTER = Vertex(5120, 2048, 0)
+
+
+def solid_methods(solids):
+    for solid in solids:
+        solid.rotate_z(CENTER, 30)
+        solid.scale(CENTER, 2, 2, 1)
+        solid.move(0, 0, 64)
+
+
+def batch(solids):
+    Transform.apply(solids, Transform.translation(0, 0, 64) @ Transform.scaling(CENTER, 2, 2, 1)
+                    @ Transform.rotation_z(CENTER, 30))
+
+
+def vertices(solids):
+    return [coordinate for solid in solids for side in solid.side for vert in side.plane
+            for coordinate in vert.export()]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    times = {}
+    results = {}
+    for function in (solid_methods, batch):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # World() prints
+            solids = build_vmf(count).get_solids()
+        start = time.perf_counter()
+        function(solids)
+        times[function.__name__] = time.perf_counter() - start
+        results[function.__name__] = vertices(solids)
+    if not all(map(math.isclose, results["solid_methods"], results["batch"])):
+        sys.exit("The vertices differ")
+
+    print(f"{count} solids, {len(results['batch']) // 3} vertices")
+    print(f"solid methods:   {times['solid_methods']:.3f} s")
+    print(f"Transform.apply: {times['batch']:.3f} s")
+    print(f"speedup:         {times['solid_methods'] / times['batch']:.1f}x")
@@ -0,0 +1,94 @@
+# benchmarks/box_brushes.py
+"""
+Compares a box-only map held as Solid objects (world.solids) with the same map held in the BoxBrushes store
+(world.boxes): memory per brush, build time and export time. Both exports are checked to be identical.
+
+Run from the project root:
+    python benchmarks/box_brushes.py [brush count]
+"""
+import contextlib
+import filecmp
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyVMF import Common, SolidGenerator, Vertex, new_vmf
+from MTS_block import apply_render_state, get_render_state
+
+BLOCKS = ("minecraft:stone", "minecraft:dirt", "minecraft:oak_planks", "minecraft:grass_block")
+
+
+def box(i):
+    """
+    Position, size and block of the i-th brush, a row of boxes of varying height.
+    """
+    return (i % 256) * 40, (i // 256) * 40, 0, 40, 40, 40 * (1 + i % 3), BLOCKS[i % len(BLOCKS)]
+
+
+def solids_vmf(count):
+    vmf = new_vmf()
+    for i in range(count):
+        x, y, z, w, h, l, block = box(i)
+        solid = SolidGenerator.cube(Vertex(x, y, z), w, h, l)
+        apply_render_state(solid, get_render_state(block, {}, cuboid=True))
+        vmf.add_solids(solid)
+    return vmf
+
+
+def boxes_vmf(count):
+    vmf = new_vmf()
+    boxes = vmf.world.boxes
+    faces = {block: boxes.face_indices(*get_render_state(block, {}, cuboid=True)) for block in BLOCKS}
+    for i in range(count):
+        x, y, z, w, h, l, block = box(i)
+        boxes.add_box(x, y, z, w, h, l, *faces[block])
+    boxes.extents  # Joins the added rows into the arrays
+    return vmf
+
+
+def measure(make, count, filename):
+    """
+    Returns (bytes per brush, build seconds, export seconds) of a map built by make.
+    """
+    get_render_state(BLOCKS[0], {}, cuboid=True)  # Fill caches (render table, texture rules) before tracing
+    gc.collect()
+    Common.ID = 0
+    tracemalloc.start()
+    vmf = make(count)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    Common.ID = 0
+    start = time.perf_counter()
+    vmf = make(count)  # Built again, tracing slows it down
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vmf.export(filename)
+    return size / count, build_time, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as folder:
+        results = {}
+        for name, make in (("Solid objects", solids_vmf), ("BoxBrushes", boxes_vmf)):
+            filename = os.path.join(folder, name + ".vmf")
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # World() prints
+                results[name] = measure(make, count, filename)
+        if not filecmp.cmp(os.path.join(folder, "Solid objects.vmf"), os.path.join(folder, "BoxBrushes.vmf"),
+                           shallow=False):
+            sys.exit("The exported files differ")
+
+    print(f"{count} brushes")
+    for name, (size, build_time, export_time) in results.items():
+        print(f"{name:14} {size:8.0f} bytes per brush, build {build_time:.2f} s, export {export_time:.2f} s")
+    (solid_size, solid_build, solid_export), (box_size, box_build, box_export) = results.values()
+    print(f"memory: {solid_size / box_size:.0f}x smaller, export: {solid_export / box_export:.1f}x faster, "
+          f"build + export: {(solid_build + solid_export) / (box_build + box_export):.1f}x faster")
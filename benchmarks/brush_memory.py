@@ -0,0 +1,54 @@
+# benchmarks/brush_memory.py
+"""
+Measures the memory held per brush: plain SolidGenerator cubes, and textured block brushes as built
+by MTS (build_block) and by the optimizer (build_cuboid).
+
+Run from the project root:
+    python benchmarks/brush_memory.py [brush count]
+"""
+import contextlib
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyVMF import SolidGenerator, Vertex
+from MTS_block import build_block, get_render_state
+from MTS_optimization import build_cuboid
+
+
+def cube(i):
+    return SolidGenerator.cube(Vertex(i * 40, 0, 0), 40, 40, 40)
+
+
+def block(i):
+    return build_block(i * 40, 0, 0, "minecraft:grass_block", render_state=get_render_state("minecraft:grass_block", {}))
+
+
+def cuboid(i):
+    return build_cuboid(i, 0, 0, 2, 3, 4, "minecraft:stone", {})
+
+
+def bytes_per_brush(make, count):
+    """
+    Returns the traced memory still allocated after building count brushes, divided by count.
+    """
+    make(0)  # Fill caches (render table, texture rules) before tracing
+    gc.collect()
+    tracemalloc.start()
+    brushes = [make(i) for i in range(count)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del brushes
+    return size / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for name, make in (("SolidGenerator.cube", cube), ("build_block", block), ("build_cuboid", cuboid)):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # build_block prints every block
+            size = bytes_per_brush(make, count)
+        print(f"{name:20} {size:8.0f} bytes per brush")
@@ -0,0 +1,119 @@
+# benchmarks/conversion_suite.py
+"""
+Converts synthetic worlds (see synthetic_worlds.py) of several sizes with get_and_convert_blocks and times
+every stage (load, scan, cull, texture, optimize, build, export) from the run report of the conversion.
+Each case is converted a few times and the best time of every stage is kept.
+
+Results are saved as JSON, and compared with a baseline saved by an earlier run: stages more than --tolerance
+slower than the baseline are reported as regressions (and the exit code is 1). Baselines are only comparable
+on the same machine.
+
+Run from the project root:
+    python benchmarks/conversion_suite.py [--worlds flat hills] [--sizes 64 128] [--save-baseline]
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import MTS_world
+from MTS_progress import ConversionProgress
+from PyVMF import Common
+from synthetic_worlds import WORLDS, SyntheticLevel
+
+DEFAULT_SIZES = (32, 64, 128)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversion_baseline.json")
+# Stages faster than this in both runs are never reported, their timings are mostly noise
+MIN_SECONDS = 0.01
+
+
+def run_case(world, size, repeat, folder, **options):
+    """
+    Converts a size x size area of a synthetic world, returns {"stages": {stage: seconds}, "counters": {...}}.
+    """
+    level = SyntheticLevel(world, 0, 0, size - 1, size - 1)
+    MTS_world.load_level = lambda path: level
+    best = {}
+    for _ in range(repeat):
+        Common.ID = 0
+        progress = ConversionProgress()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            MTS_world.get_and_convert_blocks(world, 0, 0, size - 1, size - 1, os.path.join(folder, "suite.vmf"),
+                                             progress=progress, report=False, **options)
+        for stage in progress.stages:
+            best[stage["name"]] = min(best.get(stage["name"], float("inf")), stage["wall"])
+    return {"stages": best, "total": sum(best.values()), "counters": progress.counters}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the stages that changed by more than tolerance compared to the baseline, returns the regressions.
+    """
+    regressions = []
+    for case, result in results.items():
+        old = baseline.get(case)
+        if old is None:
+            continue
+        for stage, seconds in result["stages"].items():
+            old_seconds = old["stages"].get(stage)
+            if old_seconds is None or max(seconds, old_seconds) < MIN_SECONDS:
+                continue
+            ratio = seconds / old_seconds
+            if ratio > 1 + tolerance:
+                regressions.append((case, stage))
+                print(f"REGRESSION  {case:20} {stage:9} {old_seconds:8.3f} s -> {seconds:8.3f} s ({ratio:.2f}x)")
+            elif ratio < 1 / (1 + tolerance):
+                print(f"improvement {case:20} {stage:9} {old_seconds:8.3f} s -> {seconds:8.3f} s ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--worlds", nargs="+", choices=WORLDS, default=list(WORLDS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Area sides in blocks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", help="Saves the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Saves the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for world in args.worlds:
+            for size in args.sizes:
+                case = f"{world}/{size}"
+                results[case] = result = run_case(world, size, args.repeat, folder, workers=args.workers,
+                                                  cull_hidden=True)
+                stages = "  ".join(f"{stage} {seconds:.3f}" for stage, seconds in result["stages"].items())
+                print(f"{case:20} {result['total']:8.3f} s  {result['counters']['brushes_emitted']:8} brushes  "
+                      f"{stages}")
+
+    document = {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                "repeat": args.repeat, "workers": args.workers, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file)["results"], args.tolerance)
+        print(f"{len(regressions)} regressions against {args.baseline}")
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+        print(f"Saved the baseline to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
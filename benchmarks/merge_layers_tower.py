@@ -0,0 +1,82 @@
+# benchmarks/merge_layers_tower.py
+"""
+Compares merge_layers with the previous nested-scan implementation on a synthetic tower:
+a 256 blocks high grid of 1x1 pillars, so every layer has the same few hundred rectangles.
+
+Run from the project root:
+    python benchmarks/merge_layers_tower.py [height] [pillars per side]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MTS_optimization import merge_layers, partition_layer
+
+
+def merge_layers_nested_scan(rect_dict, block_type, properties):
+    """
+    The merge_layers implementation before the hash index: for every rectangle, every layer above is
+    scanned linearly for an identical one.
+    """
+    merged = []
+    ys = sorted(rect_dict.keys())
+    processed = {y: [False] * len(rect_dict[y]) for y in ys}
+
+    for i, y in enumerate(ys):
+        for j, rect in enumerate(rect_dict[y]):
+            if processed[y][j]:
+                continue
+            current_rect = rect
+            min_y = y
+            max_y = y
+            processed[y][j] = True
+            for y_next in ys[i+1:]:
+                found = False
+                for k, rect_next in enumerate(rect_dict[y_next]):
+                    if processed[y_next][k]:
+                        continue
+                    if rect_next == current_rect:
+                        processed[y_next][k] = True
+                        max_y = y_next
+                        found = True
+                        break
+                if not found:
+                    break
+            size_x = current_rect[2]
+            size_z = current_rect[3]
+            size_y = max_y - min_y + 1
+            merged.append((current_rect[0], min_y, current_rect[1], size_x, size_y, size_z, block_type, properties))
+    return merged
+
+
+def tower(height, pillars):
+    """
+    Rectangles per layer of a tower made of pillars x pillars separate 1x1 columns.
+    """
+    coords = {(2 * i, 2 * j) for i in range(pillars) for j in range(pillars)}
+    rects = partition_layer(coords)
+    return {y: list(rects) for y in range(height)}
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    height = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    pillars = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    rect_dict = tower(height, pillars)
+    print(f"Tower: {height} layers, {pillars * pillars} rectangles per layer")
+
+    old, old_time = measure(merge_layers_nested_scan, rect_dict, "stone", {})
+    new, new_time = measure(merge_layers, rect_dict, "stone", {})
+    if sorted(old) != sorted(new):
+        sys.exit("merge_layers results differ from the nested-scan implementation")
+
+    print(f"nested scan: {old_time:.3f} s, {len(old)} cuboids")
+    print(f"hash index:  {new_time:.3f} s, {len(new)} cuboids")
+    print(f"speedup:     {old_time / new_time:.1f}x")
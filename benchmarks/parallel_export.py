@@ -0,0 +1,47 @@
+# benchmarks/parallel_export.py
+"""
+Times VMF.export with 1, 2, 4, ... worker processes, up to the CPU count (or the given limit), on a map of
+textured Solid objects and on the same map held in the BoxBrushes store. Every file is checked to be identical
+to the serial one.
+
+Run from the project root:
+    python benchmarks/parallel_export.py [brush count] [max workers]
+"""
+import contextlib
+import filecmp
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from box_brushes import boxes_vmf, solids_vmf
+from vmf_export import measure
+
+
+def worker_counts(limit):
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    print(f"{count} brushes, {os.cpu_count()} CPUs")
+    with tempfile.TemporaryDirectory() as folder:
+        for name, make in (("Solid objects", solids_vmf), ("BoxBrushes", boxes_vmf)):
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # World() prints
+                vmf = make(count)
+            serial_file = os.path.join(folder, "serial.vmf")
+            serial_time = None
+            for workers in worker_counts(limit):
+                filename = os.path.join(folder, f"{workers}.vmf")
+                export_time = measure(vmf.export, filename, (), workers)
+                if serial_time is None:
+                    serial_time = export_time
+                    os.replace(filename, serial_file)
+                elif not filecmp.cmp(serial_file, filename, shallow=False):
+                    sys.exit(f"The file exported with {workers} workers differs")
+                print(f"{name:14} {workers:3} workers: {export_time:.2f} s, {serial_time / export_time:.1f}x")
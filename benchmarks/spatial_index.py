@@ -0,0 +1,66 @@
+# benchmarks/spatial_index.py
+"""
+Times box queries with VMF.get_solids_in_box on a map of textured cubes, scanning every solid and with the spatial
+index (VMF.build_spatial_index), checks that both give the same solids, and times nearest and overlap queries.
+
+Run from the project root:
+    python benchmarks/spatial_index.py [solid count] [query count]
+"""
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyVMF import Vertex
+from vmf_export import build_vmf
+
+
+def random_boxes(count, seed=1):
+    """
+    Boxes of up to 320 units inside the area of build_vmf (256 solids of 40 units per row).
+    """
+    rng = random.Random(seed)
+    boxes = []
+    for _ in range(count):
+        x, y = rng.uniform(0, 256 * 40), rng.uniform(0, 100 * 40)
+        boxes.append((Vertex(x, y, 0), Vertex(x + rng.uniform(0, 320), y + rng.uniform(0, 320), 40)))
+    return boxes
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # World() prints
+        vmf = build_vmf(count)
+    boxes = random_boxes(queries)
+
+    start = time.perf_counter()
+    scanned = [vmf.get_solids_in_box(*box) for box in boxes]
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = vmf.build_spatial_index()
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [vmf.get_solids_in_box(*box) for box in boxes]
+    index_time = time.perf_counter() - start
+    if scanned != indexed:
+        sys.exit("The queries differ")
+
+    start = time.perf_counter()
+    for low, high in boxes:
+        index.nearest(low, 8)
+    nearest_time = time.perf_counter() - start
+    start = time.perf_counter()
+    overlaps = index.find_overlaps()
+    overlap_time = time.perf_counter() - start
+
+    print(f"{count} solids, {queries} box queries, {sum(map(len, indexed))} solids found")
+    print(f"scan:           {scan_time:.3f} s")
+    print(f"spatial index:  {index_time:.3f} s (+ {build_time:.3f} s to build)")
+    print(f"speedup:        {scan_time / index_time:.0f}x")
+    print(f"nearest 8:      {nearest_time:.3f} s")
+    print(f"find_overlaps:  {overlap_time:.3f} s ({len(overlaps)} pairs)")
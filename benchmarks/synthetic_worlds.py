@@ -0,0 +1,174 @@
+# benchmarks/synthetic_worlds.py
+"""
+Synthetic Minecraft worlds held in memory, for benchmarks that don't need a real world on disk.
+
+SyntheticLevel stands in for the part of the amulet level API used by MTS_world (get_chunk, chunk.blocks,
+chunk.block_palette and close), its chunks are generated from one of the WORLDS functions when it's created,
+so benchmarks only time the conversion. Every world is deterministic for a given seed.
+"""
+import os
+import sys
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amulet.api.errors import ChunkDoesNotExist
+
+# Generated height range, sub-chunks 0 to 4
+HEIGHT = 80
+
+
+class SyntheticBlock:
+    """
+    The block fields read by the scan (amulet.api.block.Block).
+    """
+
+    def __init__(self, base_name, properties=None):
+        self.base_name = base_name
+        self.properties = properties or {}
+
+
+# Level palette, index 0 is air like in amulet
+PALETTE = [SyntheticBlock(name, properties) for name, properties in (
+    ("air", None), ("bedrock", None), ("stone", None), ("dirt", None), ("grass_block", {"snowy": "false"}),
+    ("stone_bricks", None), ("glass", None), ("oak_planks", None), ("smooth_stone", None),
+)]
+AIR, BEDROCK, STONE, DIRT, GRASS, BRICKS, GLASS, PLANKS, SMOOTH_STONE = range(len(PALETTE))
+
+
+class SyntheticBlocks:
+    """
+    Sub-chunk arrays of a chunk (amulet chunk.blocks), indexed [x, y, z].
+    """
+
+    def __init__(self, volume):
+        self.sub_chunks = {cy: volume[:, cy * 16:cy * 16 + 16, :].copy() for cy in range(volume.shape[1] // 16)}
+
+    def has_sub_chunk(self, cy):
+        return cy in self.sub_chunks
+
+    def get_sub_chunk(self, cy):
+        return self.sub_chunks[cy]
+
+
+class SyntheticChunk:
+    def __init__(self, volume):
+        self.blocks = SyntheticBlocks(volume)
+        self.block_palette = PALETTE
+
+
+class SyntheticLevel:
+    """
+    A level holding the chunks of the area (x1, z1) - (x2, z2) (block coordinates, inclusive) of a world.
+    """
+
+    def __init__(self, world, x1, z1, x2, z2, seed=1):
+        generate = WORLDS[world]
+        self.chunks = {}
+        for cx in range(x1 // 16, x2 // 16 + 1):
+            for cz in range(z1 // 16, z2 // 16 + 1):
+                x, z = numpy.meshgrid(numpy.arange(16) + cx * 16, numpy.arange(16) + cz * 16, indexing="ij")
+                volume = numpy.zeros((16, HEIGHT, 16), dtype=numpy.uint32)
+                generate(volume, x, z, seed)
+                self.chunks[(cx, cz)] = SyntheticChunk(volume)
+
+    def get_chunk(self, cx, cz, dimension):
+        try:
+            return self.chunks[(cx, cz)]
+        except KeyError:
+            raise ChunkDoesNotExist
+
+    def close(self):
+        pass
+
+
+def value_noise(x, z, scale, seed):
+    """
+    Smooth noise in [0, 1) over block coordinates, random values on a lattice of `scale` blocks
+    interpolated with a smoothstep.
+    """
+    def lattice(a, b):
+        h = (a * 73856093) ^ (b * 19349663) ^ (seed * 83492791)
+        h = (h ^ (h >> 13)) * 1274126177
+        return ((h ^ (h >> 16)) & 0xFFFF) / 65536.0
+
+    gx, gz = numpy.floor_divide(x, scale), numpy.floor_divide(z, scale)
+    fx, fz = (x - gx * scale) / scale, (z - gz * scale) / scale
+    fx, fz = fx * fx * (3 - 2 * fx), fz * fz * (3 - 2 * fz)
+    top = lattice(gx, gz) * (1 - fx) + lattice(gx + 1, gz) * fx
+    bottom = lattice(gx, gz + 1) * (1 - fx) + lattice(gx + 1, gz + 1) * fx
+    return top * (1 - fz) + bottom * fz
+
+
+def fill_columns(volume, height):
+    """
+    Bedrock, stone, 3 blocks of dirt and grass up to height (an [x, z] array).
+    """
+    y = numpy.arange(volume.shape[1])[None, :, None]
+    height = height[:, None, :]
+    volume[y <= height] = STONE
+    volume[(y > height - 4) & (y < height)] = DIRT
+    volume[y == height] = GRASS
+    volume[:, 0, :] = BEDROCK
+
+
+def flat(volume, x, z, seed):
+    """
+    Superflat like terrain, 8 layers.
+    """
+    fill_columns(volume, numpy.full(x.shape, 7))
+
+
+def hills(volume, x, z, seed):
+    """
+    Rolling hills from two octaves of value noise, between 8 and 48 blocks high.
+    """
+    noise = 0.7 * value_noise(x, z, 32, seed) + 0.3 * value_noise(x, z, 8, seed + 1)
+    fill_columns(volume, (8 + 40 * noise).astype(int))
+
+
+def caves(volume, x, z, seed):
+    """
+    A 48 blocks thick ground crossed by winding tunnels, where hidden block culling matters most.
+    """
+    fill_columns(volume, numpy.full(x.shape, 48))
+    y = numpy.arange(1, 44)[None, :, None]
+    xs, zs = x[:, None, :], z[:, None, :]
+    tunnels = numpy.abs(numpy.sin(xs / 7 + seed + 2 * numpy.sin(zs / 11)) + numpy.sin(y / 5 + numpy.cos(xs / 9)))
+    volume[:, 1:44, :][tunnels < 0.35] = AIR
+
+
+def city(volume, x, z, seed):
+    """
+    One building per chunk on a flat ground: brick walls with glass windows, a plank floor every 4 blocks and
+    a flat roof, the heights vary from building to building.
+    """
+    fill_columns(volume, numpy.full(x.shape, 3))
+    plot_x, plot_z = x[0, 0] // 16, z[0, 0] // 16
+    top = 4 + 8 * (1 + int(value_noise(numpy.array(plot_x), numpy.array(plot_z), 1, seed) * 8))  # 12 to 68
+    lx, lz = x - plot_x * 16, z - plot_z * 16
+    inside = (lx >= 2) & (lx <= 13) & (lz >= 2) & (lz <= 13)
+    edge_x, edge_z = (lx == 2) | (lx == 13), (lz == 2) | (lz == 13)
+    wall = inside & (edge_x | edge_z)
+    window = wall & ~(edge_x & edge_z) & ((lx + lz) % 3 != 0)
+    for y in range(4, top + 1):
+        layer = volume[:, y, :]
+        if y == top or (y - 4) % 4 == 0:
+            layer[inside] = SMOOTH_STONE if y == top else PLANKS
+        else:
+            layer[wall] = BRICKS
+            if (y - 4) % 4 in (1, 2):
+                layer[window] = GLASS
+
+
+def checkerboard(volume, x, z, seed):
+    """
+    The worst case: 16 layers of stone in a 3D checkerboard with air, no two blocks can be merged and none of
+    them is hidden.
+    """
+    y = numpy.arange(1, 17)[None, :, None]
+    volume[:, 1:17, :][(x[:, None, :] + y + z[:, None, :]) % 2 == 0] = STONE
+
+
+WORLDS = {"flat": flat, "hills": hills, "caves": caves, "city": city, "checkerboard": checkerboard}
@@ -0,0 +1,104 @@
+# benchmarks/vmf_export.py
+"""
+Compares VMF.export with the previous recursive exporter (one file.write per key/value line) on a map of
+textured Solid objects, and checks that both files are identical.
+
+Run from the project root:
+    python benchmarks/vmf_export.py [solid count]
+"""
+import contextlib
+import filecmp
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyVMF import SolidGenerator, Vertex, new_vmf
+from MTS_block import apply_render_state, get_render_state
+
+BLOCKS = ("minecraft:stone", "minecraft:dirt", "minecraft:oak_planks", "minecraft:grass_block")
+
+
+def build_vmf(count):
+    vmf = new_vmf()
+    for i in range(count):
+        solid = SolidGenerator.cube(Vertex((i % 256) * 40, (i // 256) * 40, 0), 40, 40, 40 * (1 + i % 3))
+        apply_render_state(solid, get_render_state(BLOCKS[i % len(BLOCKS)], {}, cuboid=True))
+        vmf.add_solids(solid)
+    return vmf
+
+
+def recursive_export(vmf, filename):
+    """
+    The VMF.export implementation before the iterative writer (without the progress bar).
+    """
+    indent = 1
+
+    def format_converter(name, info_list):
+        t = "\t" * (indent - 1)
+        file.write(f"{t}{name}\n{t}{{\n")
+        t += "\t"
+        for item in info_list:
+            if not item:
+                continue
+            if type(item) is dict:
+                for i, j in item.items():
+                    file.write(f"{t}\"{i}\" \"{str(j)}\"\n")
+            else:
+                file.write(f"{t}\"{item[0]}\" \"{str(item[1])}\"\n")
+
+    def nest_export(category, extra_children=()):
+        nonlocal indent
+        if category is not None:
+            format_converter(category.NAME, category.export())
+            for child in itertools.chain(category.export_children(), extra_children):
+                if type(child).__name__ == "BoxBrushes":
+                    for text in child.export_text(indent):
+                        file.write(text)
+                    continue
+                if not hasattr(child, "NAME") and isinstance(child, list) and len(child) == 1:
+                    child = child[0]
+                indent += 1
+                nest_export(child)
+                indent -= 1
+            file.write("\t" * (indent - 1) + "}\n")
+
+    with open(filename, "w+") as file:
+        for item in (vmf.versioninfo, vmf.visgroups, vmf.viewsettings, vmf.world,
+                     *vmf.entity, *vmf.hidden, vmf.cameras, vmf.cordons):
+            nest_export(item)
+
+
+def measure(function, *args, repeat=3):
+    """
+    Returns the best time of a few runs, exports are disk bound enough to be noisy.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # World() prints
+        vmf = build_vmf(count)
+
+    with tempfile.TemporaryDirectory() as folder:
+        old_file = os.path.join(folder, "recursive.vmf")
+        new_file = os.path.join(folder, "export.vmf")
+        old_time = measure(recursive_export, vmf, old_file)
+        new_time = measure(vmf.export, new_file)
+        size = os.path.getsize(new_file)
+        if not filecmp.cmp(old_file, new_file, shallow=False):
+            sys.exit("The exported files differ")
+
+    print(f"{count} solids, {size / 1e6:.1f} MB")
+    print(f"recursive export: {old_time:.2f} s")
+    print(f"VMF.export:       {new_time:.2f} s")
+    print(f"speedup:          {old_time / new_time:.1f}x")
@@ -0,0 +1,88 @@
+# benchmarks/vmf_import.py
+"""
+Compares importer.file_parser with the previous parser (readlines, then re.findall and num on every line in
+TempCategory.clean_up) on an exported map of textured cubes, and checks that both give the same categories.
+Also times load_vmf, and a lazy load_vmf followed by a box query around a few solids.
+
+Run from the project root:
+    python benchmarks/vmf_import.py [solid count]
+"""
+import contextlib
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importer import TempCategory, file_parser
+from PyVMF import Vertex, load_vmf
+from vmf_export import build_vmf, measure
+
+
+def readlines_parser(file):
+    """
+    The file_parser implementation before the streaming parser.
+    """
+    with open(file, "r") as vmf:
+        indent = 0
+        previous_line = "versioninfo\n"
+        extracted = []
+
+        readlines = vmf.readlines()
+        if readlines[0] != previous_line:
+            previous_line = readlines[0]
+
+        for line in readlines[1:]:
+            if "}" in line:
+                indent -= 1
+                if indent == 0:
+                    extracted.append(t)
+                continue
+
+            if "{" in line:
+                if indent > 0:
+                    t.add_child(previous_line, indent)
+                else:
+                    t = TempCategory(previous_line, indent)
+                indent += 1
+                continue
+
+            if "\"" in line:
+                t.add_line(line, indent)
+
+            previous_line = line
+
+    for c in extracted:
+        c.clean_up()
+
+    return extracted
+
+
+def as_tuple(category):
+    return category.category, category.dic, [as_tuple(child) for child in category.children]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # World() prints
+        vmf = build_vmf(count)
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "import.vmf")
+        vmf.export(filename)
+        size = os.path.getsize(filename)
+        old_time = measure(readlines_parser, filename)
+        new_time = measure(file_parser, filename)
+        if [as_tuple(c) for c in readlines_parser(filename)] != [as_tuple(c) for c in file_parser(filename)]:
+            sys.exit("The parsed categories differ")
+        load_time = measure(load_vmf, filename, repeat=1)
+        lazy_time = measure(load_vmf, filename, 0.0001, True)
+        query_time = measure(lambda: load_vmf(filename, lazy=True).get_solids_in_box(Vertex(0, 0, 0),
+                                                                                    Vertex(100, 100, 100)))
+
+    print(f"{count} solids, {size / 1e6:.1f} MB")
+    print(f"readlines parser: {old_time:.2f} s")
+    print(f"file_parser:      {new_time:.2f} s")
+    print(f"speedup:          {old_time / new_time:.1f}x")
+    print(f"load_vmf:         {load_time:.2f} s")
+    print(f"lazy load_vmf:    {lazy_time:.2f} s ({query_time:.2f} s with a box query)")
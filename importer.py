@@ -1,5 +1,18 @@
 from tools import num
 import re
+import mmap
+import locale
+import numpy
+
+# Bytes read from the .VMF file at once
+READ_BUFFER_SIZE = 1 << 20
+# Values up to this length are converted once and then looked up, VMF files repeat the same numbers and
+# materials thousands of times
+CACHED_VALUE_LENGTH = 24
+# Most converted values remembered, ids are short but never repeat
+CACHED_VALUES = 1 << 16
+# The plane of a side, its 3 points give the bounding boxes of the solids indexed by index_file
+PLANE_PATTERN = re.compile(rb'"plane"[ \t]+"([^"]*)"')
 
 
 class TempCategory:
@@ -16,7 +29,7 @@ class TempCategory:
     def __init__(self, category, indent):
         self.category = category  # versioninfo, visgroups, world, solid, dispinfo, etc...
         self.indent = indent
-        self.data = []  # Everything inside the curly brackets other than child categories (ex: "skyname" "sky_dust")
+        self.data = []  # Raw lines added with add_line, turned into dic by clean_up
         self.children = []  # List of all children categories (ex: side, dispinfo, editor, etc...)
         self.current_child = None  # Used when going into nested children (ex: solid -> side -> dispinfo -> Normals)
         self.dic = {}  # This is where all the data is stored when it's cleaned, used when creating VMF class
@@ -55,12 +68,14 @@ class TempCategory:
 
     def clean_up(self):
         """
-        Goes through all the data to remove unecessary characters
+        Goes through all the data to remove unecessary characters, only needed for lines added with add_line,
+        :func:`file_parser` fills the dic directly
         """
         self.category = self.category.split()[0]  # We remove the tabs
         for i in self.data:
             clean = re.findall(r'\"(.*?)\"', i)  # We remove the double quotes and separate (example line: "id" "2688")
             self.dic[clean[0]] = num(clean[1])  # The values, IF possible are turned into either ints or floats
+        self.data.clear()
 
         for j in self.children:
             j.clean_up()  # Nested function calls
@@ -68,45 +83,200 @@ class TempCategory:
 
 def file_parser(file):
     """
-    Opens the file, extracts data line by line and turns it all into temporary categories
+    Reads the file line by line in a single pass and turns it all into temporary categories, the values are
+    stored in the category dics as they're read (see :func:`tools.num`)
+
+    Quoted keys and values are taken as they are, braces or quotes inside them don't open or close categories.
 
     :param file: The OS file to open, path needs to be included
     :type file: :obj:`str`
     :return: All the top level categories
     :rtype: :obj:`list` of :class:`TempCategory`
     """
-    with open(file, "r") as vmf:
+    with open(file, "r", buffering=READ_BUFFER_SIZE) as vmf:
+        return _parse_lines(vmf)  # This is used when creating a VMT class
 
-        indent = 0
-        previous_line = "versioninfo\n"  # We only know it's a category the next line (the curly brackets open)
-        extracted = []
 
-        readlines  = vmf.readlines()
-        if readlines[0] != previous_line:
-            previous_line = readlines[0]
+def _parse_lines(lines):
+    """
+    The parser of :func:`file_parser`, lines is any iterable of text lines
+    """
+    extracted = []
+    stack = []  # Categories being read, from the top level one to the innermost
+    dic = None  # dic of the innermost category
+    name = "versioninfo"  # The name comes on the line before the opening curly bracket
+    values = {}  # Short value string -> converted value
+    split_pair = re.compile(r'"([^"]*)"').findall
 
-        for line in readlines[1:]:
-            if "}" in line:
-                indent -= 1
-                if indent == 0:  # If indent is not 0 we know it's a child category and not a main category
-                    extracted.append(t)
-                continue
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        first = line[0]
 
-            if "{" in line:
-                if indent > 0:  # If indent is not 0 we know it's a child category and not a main category
-                    # Open curly brackets ALWAYS follow a category, so we know the previous line is the category name
-                    t.add_child(previous_line, indent)
-                else:
-                    t = TempCategory(previous_line, indent)  # This is a main category (not a child category)
-                indent += 1
+        if first == '"':  # Data, ex: "id" "2688"
+            parts = line.split('"')
+            if len(parts) == 5:
+                key, value = parts[1], parts[3]
+            else:  # Spaces or other text around the quotes
+                key, value = split_pair(line)[:2]
+
+            if value and value[0] in "([":  # Planes, uv axes... are never numbers
+                dic[key] = value
                 continue
+            converted = values.get(value)
+            if converted is None:
+                converted = num(value)
+                if len(value) <= CACHED_VALUE_LENGTH and len(values) < CACHED_VALUES:
+                    values[value] = converted
+            dic[key] = converted
+
+        elif first == "{":
+            category = TempCategory(name, len(stack))
+            if stack:
+                stack[-1].children.append(category)
+            else:
+                extracted.append(category)
+            stack.append(category)
+            dic = category.dic
+
+        elif first == "}":
+            stack.pop()
+            dic = stack[-1].dic if stack else None
+
+        else:
+            name = line.split()[0]
+
+    return extracted
+
+
+class VMFIndex:
+    """
+    Index of a memory-mapped .VMF file built by :func:`index_file`: the byte ranges of the top level categories
+    and of the world solids, with the bounding boxes of the world solids. Nothing is parsed until a range is
+    given to :func:`~VMFIndex.parse`.
+
+    :param data: The memory-mapped file
+    :type data: :obj:`mmap.mmap`
+    :param categories: (name, start, end) of every top level category, in the order of the file
+    :type categories: :obj:`list` of :obj:`tuple`
+    :param solids: (start, end) of every world solid, shape (n, 2)
+    :type solids: :obj:`numpy.ndarray`
+    :param mins: Lowest corner of the bounding box of every world solid, shape (n, 3), -inf if a solid has no planes
+    :type mins: :obj:`numpy.ndarray`
+    :param maxs: Highest corner of the bounding box of every world solid, shape (n, 3), inf if a solid has no planes
+    :type maxs: :obj:`numpy.ndarray`
+    """
+
+    def __init__(self, data, categories, solids, mins, maxs):
+        self.data = data
+        self.categories = categories
+        self.solids = solids
+        self.mins = mins
+        self.maxs = maxs
+        self.encoding = locale.getpreferredencoding(False)  # The encoding file_parser reads with
+
+    def parse(self, ranges):
+        """
+        Parses byte ranges of the file as if they were one file, each range has to hold whole categories
+
+        :param ranges: (start, end) byte ranges
+        :type ranges: :obj:`list` of :obj:`tuple`
+        :return: The top level categories of the ranges
+        :rtype: :obj:`list` of :class:`TempCategory`
+        """
+        data = self.data
+        text = b"".join([data[start:end] for start, end in ranges]).decode(self.encoding)
+        return _parse_lines(text.splitlines())
+
+    def close(self):
+        self.data.close()
+
+
+def index_file(file):
+    """
+    Memory-maps the file and indexes it in a single scan (see :class:`VMFIndex`), without parsing the categories.
+
+    Categories are found from the lines starting with a curly bracket (after the indentation), which is never
+    the case of the data lines. The bounding box of a solid is made of the points of its side planes.
+
+    :param file: The OS file to open, path needs to be included
+    :type file: :obj:`str`
+    :return: The index of the file
+    :rtype: :class:`VMFIndex`
+    """
+    with open(file, "rb") as vmf:
+        data = mmap.mmap(vmf.fileno(), 0, access=mmap.ACCESS_READ)
+    raw = numpy.frombuffer(data, dtype=numpy.uint8)
+    last = len(raw) - 1
+
+    # First character of every line, after the indentation
+    starts = numpy.flatnonzero(raw == 10) + 1
+    starts = numpy.concatenate(([0], starts[starts <= last]))
+    ends = numpy.append(starts[1:], len(raw))
+    first = starts.copy()
+    while True:
+        indented = raw[first] == 9
+        indented |= raw[first] == 32
+        indented &= first < last
+        if not indented.any():
+            break
+        first[indented] += 1
+    chars = raw[first]
+
+    # Curly bracket lines, an opening and its closing bracket get the same depth
+    brackets = numpy.flatnonzero((chars == 123) | (chars == 125))
+    opening = chars[brackets] == 123
+    depth = numpy.cumsum(numpy.where(opening, 1, -1)) - opening
+
+    # The name of a category is on the last line with text before its opening bracket
+    text_lines = numpy.flatnonzero((chars != 10) & (chars != 13))
+
+    def categories(at_depth, after=-1, before=len(chars)):
+        # Name lines, first and last bytes, opening and closing lines of the categories at a depth between two lines
+        inside = (depth == at_depth) & (brackets > after) & (brackets < before)
+        open_lines, close_lines = brackets[inside & opening], brackets[inside & ~opening]
+        open_lines = open_lines[:len(close_lines)]  # An unfinished file
+        name_lines = text_lines[numpy.maximum(numpy.searchsorted(text_lines, open_lines) - 1, 0)]
+        return name_lines, starts[name_lines], ends[close_lines], open_lines, close_lines
+
+    def named(name_lines, name):
+        # Which of the name lines hold the name
+        found = numpy.ones(len(name_lines), dtype=bool)
+        for offset, char in enumerate(name + b"\n"):
+            at = raw[numpy.minimum(first[name_lines] + offset, last)]
+            found &= (at == char) if char != 10 else (at == 9) | (at == 10) | (at == 13) | (at == 32)
+        return found
 
-            if "\"" in line: t.add_line(line, indent)  # ALL lines with data have double quotes in them
+    name_lines, top_starts, top_ends, top_opens, top_closes = categories(0)
+    top = [(data[first[line]:ends[line]].split()[0].decode("ascii", "replace"), int(start), int(end))
+           for line, start, end in zip(name_lines, top_starts, top_ends)]
+    world = next((i for i, category in enumerate(top) if category[0] == "world"), None)
+    solids = numpy.zeros((0, 2), dtype=numpy.int64)
+    if world is not None:
+        name_lines, child_starts, child_ends = categories(1, top_opens[world], top_closes[world])[:3]
+        solid = named(name_lines, b"solid")
+        solids = numpy.stack((child_starts[solid], child_ends[solid]), axis=1).astype(numpy.int64)
 
-            previous_line = line
+    mins = numpy.full((len(solids), 3), -numpy.inf)
+    maxs = numpy.full((len(solids), 3), numpy.inf)
+    if len(solids):
+        # Plane lines of the world, in the same order as the plane values found with PLANE_PATTERN
+        quoted = first[(chars == 34) & (first >= solids[0, 0]) & (first < solids[-1, 1])]
+        plane = numpy.ones(len(quoted), dtype=bool)
+        for offset, char in enumerate(b'"plane"'):
+            plane &= raw[numpy.minimum(quoted + offset, last)] == char
+        positions = quoted[plane]
+        values = PLANE_PATTERN.findall(data, int(solids[0, 0]), int(solids[-1, 1]))
+        points = numpy.fromstring(b" ".join(values).translate(None, b"()").decode("ascii", "replace"), sep=" ")
 
-    for c in extracted:
-        # clean_up is a recursive function we only need to call it on the main categories
-        c.clean_up()
+        if len(values) == len(positions) and len(points) == 9 * len(values):
+            points = points.reshape(-1, 3, 3)
+            solid = numpy.searchsorted(solids[:, 0], positions, "right") - 1
+            inside = positions < solids[solid, 1]  # Not in a hidden solid between two world solids
+            solid, points = solid[inside], points[inside]
+            numbers, first_plane = numpy.unique(solid, return_index=True)
+            mins[numbers] = numpy.minimum.reduceat(points.min(axis=1), first_plane)
+            maxs[numbers] = numpy.maximum.reduceat(points.max(axis=1), first_plane)
 
-    return extracted  # This is used when creating a VMT class
+    return VMFIndex(data, top, solids, mins, maxs)
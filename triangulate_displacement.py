@@ -41,7 +41,15 @@ def triangulate_displacement(vmf: VMF, group: List[Solid], base_triangle: Solid
 
             size.divide(disp.matrix_size_fix/resolution)
 
-            triangle = base_triangle.copy()
+            # The rotated and scaled triangles of the "normal" and flipped squares, each square is a moved copy
+            triangles = {}
+            for flip in (False, True):
+                left_tri = base_triangle.copy()
+                Transform.apply((left_tri,), Transform.scaling(Vertex(0, 0, 0), size.x, size.y, 1)
+                                @ Transform.rotation_z(left_tri.center_geo, flip * -90))
+                right_tri = left_tri.copy()
+                Transform.apply((right_tri,), Transform.rotation_z(right_tri.center_geo, 180))
+                triangles[flip] = (left_tri, right_tri)
 
             flipped = True  # Whether the "triangle square" should be flipped or not
             tris_list = []
@@ -49,14 +57,9 @@ def triangulate_displacement(vmf: VMF, group: List[Solid], base_triangle: Solid
                 # The last "triangle square" of a row is the same flip direction as the first in the next row
                 flipped = not flipped
                 for sx in range(0, disp.matrix_size_fix, resolution):
-                    left_tri = triangle.copy()
-
-                    left_tri.rotate_z(left_tri.center_geo, flipped * -90)
-                    left_tri.scale(Vertex(0, 0, 0), size.x, size.y, 1)
+                    left_tri, right_tri = (tri.copy() for tri in triangles[flipped])
                     left_tri.move(sx * size.x / resolution, sy * -size.y / resolution, 0)
-
-                    right_tri = left_tri.copy()
-                    right_tri.rotate_z(right_tri.center_geo, 180)
+                    right_tri.move(sx * size.x / resolution, sy * -size.y / resolution, 0)
 
                     # --------------------------------- Change the values here for some cool geometry
                     left_tri.move(0, 0, 0)
@@ -94,8 +97,6 @@ def triangulate_displacement(vmf: VMF, group: List[Solid], base_triangle: Solid
 
             move.z = solid.get_axis_extremity(z=True).z
 
-            for trio in tris_list:
-                trio.rotate_z(center, 0)
-                trio.move(*move.export())
+            Transform.apply(tris_list, Transform.translation(*move.export()))
 
     return export_list